@@ -0,0 +1,130 @@
+import os
+from typing import Optional, Dict
+import numpy as np
+from qdrant_client import models
+
+# Where fitted projections are stored, one file per collection
+PROJECTION_DIR = os.environ.get("QDRANT_PROJECTION_DIR", "projections")
+
+QUANTIZATION_KINDS = ("scalar", "binary")
+
+_projection_cache: Dict[str, Optional[dict]] = {}
+
+
+def fit_projection(embeddings: np.ndarray, dim: int, method: str = "pca") -> dict:
+    """
+    Fit a projection that reduces embeddings to `dim` dimensions.
+
+    method="pca" centers the catalog and keeps the top principal components.
+    method="matryoshka" keeps the leading `dim` coordinates (no fitting needed).
+    """
+    if dim >= embeddings.shape[1]:
+        raise ValueError(f"dim={dim} must be smaller than the embedding size {embeddings.shape[1]}")
+
+    if method == "matryoshka":
+        return {"method": method, "dim": dim}
+    if method != "pca":
+        raise ValueError(f"Unknown reduction method: {method}")
+
+    # SVD of n rows yields at most n axes; fewer rows than dim would silently project
+    # to a narrower space than the collection's vector size
+    if embeddings.shape[0] < dim:
+        raise ValueError(f"PCA to {dim} dims needs at least {dim} rows to fit on, got {embeddings.shape[0]}")
+
+    mean = embeddings.mean(axis=0, dtype=np.float64)
+    # Right singular vectors of the centered matrix are the principal axes
+    _, _, vt = np.linalg.svd(embeddings - mean, full_matrices=False)
+    return {
+        "method": method,
+        "dim": dim,
+        "mean": mean.astype(np.float32),
+        "components": vt[:dim].T.astype(np.float32),
+    }
+
+
+def apply_projection(vectors: np.ndarray, projection: Optional[dict]) -> np.ndarray:
+    """
+    Project vectors (n x d or d) and re-normalize them so cosine distance still applies.
+    Returns float32 vectors; a None projection only casts and normalizes.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if projection is not None:
+        if projection["method"] == "pca":
+            vectors = (vectors - projection["mean"]) @ projection["components"]
+        else:
+            vectors = vectors[..., :projection["dim"]]
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def projection_path(collection_name: str) -> str:
+    return os.path.join(PROJECTION_DIR, f"{collection_name}.npz")
+
+
+def save_projection(collection_name: str, projection: Optional[dict]):
+    """
+    Persist the projection for a collection so queries are reduced the same way.
+    Passing None removes any stale projection left from a previous build.
+    """
+    path = projection_path(collection_name)
+    _projection_cache.pop(collection_name, None)
+    if projection is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(PROJECTION_DIR, exist_ok=True)
+    np.savez(path, **projection)
+
+
+def load_projection(collection_name: str) -> Optional[dict]:
+    """
+    Load (and cache) the projection used by a collection, or None if it stores full vectors.
+    """
+    if collection_name not in _projection_cache:
+        path = projection_path(collection_name)
+        projection = None
+        if os.path.exists(path):
+            with np.load(path) as data:
+                projection = {key: data[key] for key in data.files}
+            projection["method"] = str(projection["method"])
+            projection["dim"] = int(projection["dim"])
+        _projection_cache[collection_name] = projection
+    return _projection_cache[collection_name]
+
+
+def quantization_config(kind: Optional[str]):
+    """
+    Build the Qdrant quantization config for `kind` ("scalar", "binary" or None).
+    Quantized vectors are kept in RAM while the originals can stay on disk for rescoring.
+    """
+    if kind is None:
+        return None
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    raise ValueError(f"Unknown quantization kind: {kind}. Expected one of {QUANTIZATION_KINDS}")
+
+
+def search_params(oversampling: Optional[float] = None):
+    """
+    Search params that rescore quantized candidates with the original vectors.
+    Binary quantization usually needs oversampling of 2-3x to keep recall.
+    """
+    if oversampling is None:
+        return None
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            ignore=False,
+            rescore=True,
+            oversampling=oversampling,
+        )
+    )
@@ -3,11 +3,20 @@
 Test file for Qdrant collection functionality
 """
 
-from data.embeddings.quadrant import client, embedding_model, COLLECTION
-from database.db import get_noisy_variants
+import time
+from data.embeddings.quadrant import (client, embedding_model, get_sparse_model, COLLECTION, MULTI_COLLECTION,
+                                      SPARSE_VECTOR, point_id)
+from data.embeddings.compression import load_projection, apply_projection, search_params
+from database.db import iter_labeled_noisy_variants
 from qdrant_client import models
 from data.embeddings.evaluation_metrics import precision_recall
-import re
+from matching.normalize import parse_query
+from matching.families import expand_families
+
+# Candidates each prefetch hands to the RRF fusion
+PREFETCH_K = 50
+# Closest makes whose points are re-ranked by model similarity
+MAKE_CANDIDATES = 1000
 
 
 def view_collection(collection_name: str = COLLECTION, limit: int = 10):
@@ -43,41 +52,106 @@ def view_collection(collection_name: str = COLLECTION, limit: int = 10):
         print(f"❌ Error viewing collection: {e}")
 
 
-def search(query: str, top_k: int = 10):
+def search(query: str, top_k: int = 10, collection_name: str = COLLECTION, oversampling: float = None):
     """
     Search for similar vehicles using local embeddings.
+    If the collection was built with a reduced dimension the query is projected the same way;
+    oversampling rescores quantized candidates with the original vectors.
     """
-    # Try to capture a year to filter (optional)
-    year_match = re.search(r"\b(19\d{2}|20\d{2})\b", query)
+    # Expand make abbreviations and capture a year to filter (optional)
+    parsed = parse_query(query)
+    year = parsed.year
     q_filter = None
-    if year_match:
-        year = int(year_match.group(0))
+    if year is not None:
         q_filter = models.Filter(
             must=[models.FieldCondition(key="year", match=models.MatchValue(value=year))]
         )
 
-    # Generate embedding for the query using FastEmbed
-    query_embedding = list(embedding_model.embed([query.lower()]))[0]
+    # Embed the canonical "{year} {make} {model}" text, like the indexed documents
+    query_embedding = list(embedding_model.embed([parsed.text]))[0]
+    projection = load_projection(collection_name)
+    if projection is not None:
+        query_embedding = apply_projection(query_embedding, projection)
     
     # Search in Qdrant
     res = client.query_points(
-        collection_name=COLLECTION,
+        collection_name=collection_name,
         query=query_embedding.tolist(),
         query_filter=q_filter,
+        search_params=search_params(oversampling),
         limit=top_k,
         with_payload=True,
     )
     
-    return [
+    return _format_points(res, year, top_k)
+
+
+def _format_points(res, year, top_k):
+    results = [
         {
             "score": round(p.score, 4),
             "id": p.id,
             "make": p.payload.get("make"),
             "model": p.payload.get("model"),
             "year": p.payload.get("year"),
+            "variants": p.payload.get("variants"),
         }
         for p in res.points
     ]
+    # Points of a collapsed collection expand back to one result per (model_id, year)
+    return expand_families(results, year, top_k, point_id)
+
+
+def search_multi(query: str, top_k: int = 10, collection_name: str = MULTI_COLLECTION,
+                 prefetch_k: int = PREFETCH_K, make_candidates: int = MAKE_CANDIDATES):
+    """
+    Search a multi-vector collection (build_embeddings(multi_vector=True)) in one request.
+
+    The parsed query feeds up to three prefetches, fused with reciprocal rank fusion:
+    the dense "text" vector, the sparse BM25 vector (exact tokens and abbreviations), and
+    the "model" vector over the points whose "make" vector is closest to the query's make,
+    so a typo in one part no longer drags the whole-text similarity down.
+    """
+    parsed = parse_query(query)
+    q_filter = None
+    if parsed.year is not None:
+        q_filter = models.Filter(
+            must=[models.FieldCondition(key="year", match=models.MatchValue(value=parsed.year))]
+        )
+
+    make_text = parsed.make or " ".join(parsed.make_tokens)
+    model_text = " ".join(parsed.model_tokens)
+    texts = [parsed.text] + [t for t in (make_text, model_text) if t]
+    vectors = [v.tolist() for v in embedding_model.embed(texts)]
+    text_vector = vectors.pop(0)
+    make_vector = vectors.pop(0) if make_text else None
+    model_vector = vectors.pop(0) if model_text else None
+    sparse = next(iter(get_sparse_model().query_embed(parsed.text)))
+
+    prefetch = [
+        models.Prefetch(query=text_vector, using="text", filter=q_filter, limit=prefetch_k),
+        models.Prefetch(query=models.SparseVector(indices=sparse.indices.tolist(), values=sparse.values.tolist()),
+                        using=SPARSE_VECTOR, filter=q_filter, limit=prefetch_k),
+    ]
+    if make_vector is not None and model_vector is not None:
+        prefetch.append(models.Prefetch(
+            prefetch=models.Prefetch(query=make_vector, using="make", filter=q_filter, limit=make_candidates),
+            query=model_vector, using="model", limit=prefetch_k,
+        ))
+    elif make_vector is not None or model_vector is not None:
+        # The make or the model was dropped from the string; match the part that is there
+        name = "make" if make_vector is not None else "model"
+        prefetch.append(models.Prefetch(query=make_vector or model_vector, using=name, filter=q_filter,
+                                        limit=prefetch_k))
+
+    res = client.query_points(
+        collection_name=collection_name,
+        prefetch=prefetch,
+        query=models.FusionQuery(fusion=models.Fusion.RRF),
+        limit=top_k,
+        with_payload=True,
+    )
+    return _format_points(res, parsed.year, top_k)
 
 
 def demo_search(queries: list = None):
@@ -97,22 +171,26 @@ def demo_search(queries: list = None):
         for i, result in enumerate(results, 1):
             print(f"   {i}. {result['year']} {result['make']} {result['model']} (score: {result['score']})")
 
-def evaluate(limit=5, k=3):
+def evaluate(limit=5, k=3, collection_name=COLLECTION, oversampling=None, multi_vector=False):
     """
     search_fn: function that takes noisy_string -> returns ranked list of dicts
-    noisy_variants: iterable of dicts {noisy_string, make_id, model_id, year}
+    noisy_variants: iterable of tuples (noisy_string, make_name, model_name, year, noise_type)
+    multi_vector: search with search_multi (collection_name must be a multi-vector collection)
     """
     total_precision = 0
     total_recall = 0
     total_queries = 0
 
 
-    noisy_variants = get_noisy_variants(limit=limit)
+    noisy_variants = iter_labeled_noisy_variants(limit=limit)
 
     for row in noisy_variants:
-        noisy_string, model_id, make_id, year = row
-        truth = (make_id, model_id, year)
-        results = search(noisy_string, k)
+        noisy_string, make_name, model_name, year, _ = row
+        truth = (make_name, model_name, year)
+        if multi_vector:
+            results = search_multi(noisy_string, k, collection_name=collection_name)
+        else:
+            results = search(noisy_string, k, collection_name=collection_name, oversampling=oversampling)
 
         # --- Precision/Recall ---
         correct, retrieved = precision_recall(results, truth)
@@ -126,3 +204,41 @@ def evaluate(limit=5, k=3):
         "Recall": total_recall / total_queries,
     }
     return metrics
+
+
+def compare_storage(compressed_collection: str, baseline_collection: str = COLLECTION,
+                    limit=100, k=3, oversampling=None):
+    """
+    Report the recall cost of a quantized / dimension-reduced collection
+    against the full float32 baseline built from the same catalog slice.
+    """
+    baseline = evaluate(limit=limit, k=k, collection_name=baseline_collection)
+    compressed = evaluate(limit=limit, k=k, collection_name=compressed_collection, oversampling=oversampling)
+
+    print(f"📊 Recall@{k} on {limit} noisy variants")
+    print(f"   {baseline_collection}: {baseline['Recall']:.4f}")
+    print(f"   {compressed_collection}: {compressed['Recall']:.4f}")
+    print(f"   Recall cost: {baseline['Recall'] - compressed['Recall']:+.4f}")
+    return {"baseline": baseline, "compressed": compressed,
+            "recall_cost": baseline["Recall"] - compressed["Recall"]}
+
+
+def compare_multi_vector(multi_collection: str = MULTI_COLLECTION, baseline_collection: str = COLLECTION,
+                         limit=300, ks=(1, 3, 5, 10)):
+    """
+    Recall@k and mean latency of prefetch + RRF search over the multi-vector collection
+    against single-vector search, to find the smallest k that matches the baseline's recall.
+    Build both from the same catalog slice first (build_embeddings(multi_vector=True)).
+    """
+    report = {}
+    for name, multi in ((baseline_collection, False), (multi_collection, True)):
+        report[name] = {}
+        for k in ks:
+            start = time.perf_counter()
+            recall = evaluate(limit=limit, k=k, collection_name=name, multi_vector=multi)["Recall"]
+            report[name][k] = {"recall": recall, "ms": (time.perf_counter() - start) * 1000 / limit}
+
+    print(f"📊 Recall@k on {limit} noisy variants (mean ms/query)")
+    for name, by_k in report.items():
+        print(f"   {name}: " + "  ".join(f"@{k} {row['recall']:.4f} ({row['ms']:.1f} ms)" for k, row in by_k.items()))
+    return report
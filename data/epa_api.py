@@ -0,0 +1,34 @@
+import os
+from urllib.parse import urlencode
+from .harvest import cached_get_json, RateLimiter, CACHE_DIR
+
+BASE_URL = "https://www.fueleconomy.gov/ws/rest/vehicle/menu"
+EPA_CACHE_DIR = os.path.join(CACHE_DIR, "epa")
+
+# The service answers XML unless JSON is requested explicitly
+HEADERS = {"Accept": "application/json"}
+
+limiter = RateLimiter(per_second=10)
+
+def _menu_items(data):
+    """Menu responses hold a list of {text, value} items, a single dict, or nothing."""
+    items = (data or {}).get("menuItem") or []
+    if isinstance(items, dict):
+        items = [items]
+    return [item["value"] for item in items]
+
+def _get(path, params, cache_dir, offline):
+    url = f"{BASE_URL}/{path}" + (f"?{urlencode(params)}" if params else "")
+    return cached_get_json(url, cache_dir, headers=HEADERS, offline=offline, limiter=limiter)
+
+def fetch_years(cache_dir=EPA_CACHE_DIR, offline=False):
+    """Fetch all model years EPA has data for"""
+    return [int(y) for y in _menu_items(_get("year", None, cache_dir, offline))]
+
+def fetch_makes_for_year(year, cache_dir=EPA_CACHE_DIR, offline=False):
+    """Fetch all make names for a year"""
+    return _menu_items(_get("make", {"year": year}, cache_dir, offline))
+
+def fetch_models_for_make_year(make_name, year, cache_dir=EPA_CACHE_DIR, offline=False):
+    """Fetch all model names for a make name and year"""
+    return _menu_items(_get("model", {"year": year, "make": make_name}, cache_dir, offline))
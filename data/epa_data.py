@@ -0,0 +1,35 @@
+from .epa_api import fetch_years, fetch_makes_for_year, fetch_models_for_make_year, EPA_CACHE_DIR
+from .harvest import IncrementalWriter, RowCollector, run_harvest
+
+def epa_combine_makes_and_models(csv_path="epa_make_model_year.csv", json_path=None,
+                                 workers=8, cache_dir=EPA_CACHE_DIR, offline=False):
+    """
+    Fetch every (make, year) model menu from FuelEconomy.gov, same design as the NHTSA harvest.
+    EPA has no ids, so Make_ID / Model_ID are left blank (load_csv falls back to names).
+    """
+    years = fetch_years(cache_dir=cache_dir, offline=offline)
+    print(f"✅ EPA years: {min(years)}-{max(years)}" if years else "⚠️ No EPA years returned")
+
+    # Makes per year are one request each; fetch them concurrently too
+    def fetch_makes(year):
+        return [(make, year) for make in fetch_makes_for_year(year, cache_dir=cache_dir, offline=offline)]
+
+    collector = RowCollector()
+    run_harvest(years, fetch_makes, collector, workers=workers, desc="EPA makes")
+    make_tasks = collector.rows
+
+    def fetch(task):
+        make_name, year = task
+        return [{
+            "Make_ID": "",
+            "Make_Name": make_name,
+            "Model_ID": "",
+            "Model_Name": model_name,
+            "Year": year
+        } for model_name in fetch_models_for_make_year(make_name, year, cache_dir=cache_dir, offline=offline)]
+
+    with IncrementalWriter(csv_path, json_path) as writer:
+        failures = run_harvest(make_tasks, fetch, writer, workers=workers, desc="EPA models")
+
+    print(f"📄 Saved EPA CSV with {writer.count} records ({failures} failed requests)")
+    return writer.count
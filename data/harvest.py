@@ -0,0 +1,136 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional
+import requests
+from tqdm import tqdm
+
+CACHE_DIR = os.environ.get("HARVEST_CACHE_DIR", "http_cache")
+CSV_FIELDS = ["Make_ID", "Make_Name", "Model_ID", "Model_Name", "Year"]
+
+_session = requests.Session()
+
+
+class RateLimiter:
+    """Spaces requests across all worker threads (replaces the per-request sleep)."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+def cached_get_json(url: str, cache_dir: Optional[str] = None, headers: Optional[Dict] = None,
+                    offline: bool = False, limiter: Optional[RateLimiter] = None, retries: int = 3):
+    """
+    GET a JSON document, caching the raw response on disk under cache_dir.
+
+    Cached responses double as recorded fixtures: with offline=True nothing is fetched
+    and a missing response raises FileNotFoundError.
+    """
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, hashlib.sha1(url.encode()).hexdigest() + ".json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    if offline:
+        raise FileNotFoundError(f"No recorded response for {url}")
+
+    for attempt in range(retries):
+        if limiter:
+            limiter.wait()
+        try:
+            response = _session.get(url, headers=headers, timeout=30)
+            response.raise_for_status()
+            break
+        except requests.RequestException:
+            if attempt == retries - 1:
+                raise
+            time.sleep(2 ** attempt)
+
+    # Some endpoints answer an empty body when there is nothing to list
+    data = response.json() if response.content.strip() else None
+    if path:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    return data
+
+
+class IncrementalWriter:
+    """
+    Appends rows to a CSV and a JSON array as they arrive, so a long harvest
+    never holds the whole dataset in memory and partial output survives a crash.
+    """
+
+    def __init__(self, csv_path: str, json_path: Optional[str] = None, fieldnames: List[str] = CSV_FIELDS):
+        self._csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._csv_file, fieldnames=fieldnames)
+        self._csv.writeheader()
+        self._json_file = open(json_path, "w", encoding="utf-8") if json_path else None
+        if self._json_file:
+            self._json_file.write("[")
+        self.count = 0
+
+    def write_rows(self, rows: Iterable[Dict]):
+        for row in rows:
+            self._csv.writerow(row)
+            if self._json_file:
+                self._json_file.write(("," if self.count else "") + "\n" + json.dumps(row))
+            self.count += 1
+
+    def close(self):
+        self._csv_file.close()
+        if self._json_file:
+            self._json_file.write("\n]\n")
+            self._json_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RowCollector:
+    """In-memory stand-in for IncrementalWriter, for small intermediate results."""
+
+    def __init__(self):
+        self.rows = []
+
+    def write_rows(self, rows: Iterable[Dict]):
+        self.rows.extend(rows)
+
+
+def run_harvest(tasks: List, fetch_fn: Callable, writer, workers: int = 8,
+                desc: str = "Harvesting") -> int:
+    """
+    Run fetch_fn(task) -> rows for every task on a thread pool and hand rows to
+    writer.write_rows as tasks finish (writes happen on this thread only).
+    Failed tasks are reported and skipped. Returns the number of failed tasks.
+    """
+    failures = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_fn, task): task for task in tasks}
+        for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+            try:
+                writer.write_rows(future.result())
+            except Exception as e:
+                failures += 1
+                print(f"⚠️ Error fetching {futures[future]}: {e}")
+    return failures
@@ -0,0 +1,141 @@
+import csv
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from matching.features import jaro_winkler
+from .harvest import IncrementalWriter, CSV_FIELDS, CACHE_DIR
+from .nhtsa_data import nhtsa_combine_makes_and_models
+from .epa_data import epa_combine_makes_and_models
+
+# Corporate suffixes that differ between sources ("HONDA" vs "HONDA MOTOR CO")
+_SUFFIXES = {"INC", "LLC", "LTD", "CO", "CORP", "CORPORATION", "COMPANY", "MOTOR", "MOTORS", "MFG"}
+_NON_ALNUM = re.compile(r"[^A-Z0-9 ]+")
+
+MAKE_THRESHOLD = 0.93
+MODEL_THRESHOLD = 0.92
+
+
+def make_key(name: str) -> str:
+    """Uppercase, strip punctuation and corporate suffixes: "Mercedes-Benz USA, LLC" -> "MERCEDESBENZ USA"."""
+    tokens = _NON_ALNUM.sub("", (name or "").upper().replace("-", "")).split()
+    kept = [t for t in tokens if t not in _SUFFIXES]
+    return " ".join(kept or tokens)
+
+
+def model_key(name: str) -> str:
+    return " ".join(_NON_ALNUM.sub(" ", (name or "").upper()).split())
+
+
+def _block(key: str) -> str:
+    """Blocking key: only names sharing their first three characters are compared fuzzily."""
+    return key.replace(" ", "")[:3]
+
+
+class _BlockedIndex:
+    """
+    Exact lookup by key, falling back to Jaro-Winkler within the key's block,
+    so matching n names against m costs about n * (m / blocks) comparisons instead of n * m.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.exact: Dict[str, object] = {}
+        self.blocks: Dict[str, List[Tuple[str, object]]] = defaultdict(list)
+
+    def add(self, key: str, value):
+        if key and key not in self.exact:
+            self.exact[key] = value
+            self.blocks[_block(key)].append((key, value))
+
+    def match(self, key: str):
+        if key in self.exact:
+            return self.exact[key]
+        best, best_score = None, self.threshold
+        for other, value in self.blocks.get(_block(key), ()):
+            score = jaro_winkler(key, other)
+            if score >= best_score:
+                best, best_score = value, score
+        return best
+
+
+def _read_rows(path: str):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def merge_sources(nhtsa_csv: str, epa_csv: str, out_csv: str = "make_model_year.csv") -> Dict[str, int]:
+    """
+    Merge EPA rows into the NHTSA catalog.
+
+    EPA makes are reconciled to NHTSA makes and EPA models to that make's NHTSA models
+    for the same year (exact key, then trim prefix "CIVIC HF" -> "CIVIC", then blocked
+    fuzzy match). Matched EPA rows are duplicates and dropped; the rest are appended,
+    attached to the NHTSA make when it matched. Output has the load_csv column layout.
+    """
+    makes = _BlockedIndex(MAKE_THRESHOLD)
+    models: Dict[Tuple[str, int], _BlockedIndex] = defaultdict(lambda: _BlockedIndex(MODEL_THRESHOLD))
+    stats = defaultdict(int)
+
+    with IncrementalWriter(out_csv, fieldnames=CSV_FIELDS) as writer:
+        # NHTSA is canonical: copy it through while indexing makes and (make, year) models
+        for row in _read_rows(nhtsa_csv):
+            makes.add(make_key(row["Make_Name"]), (row["Make_ID"], row["Make_Name"]))
+            models[(row["Make_ID"], int(row["Year"]))].add(model_key(row["Model_Name"]), row["Model_ID"])
+            writer.write_rows([row])
+            stats["nhtsa"] += 1
+
+        make_cache: Dict[str, Optional[tuple]] = {}
+        for row in _read_rows(epa_csv):
+            stats["epa"] += 1
+            epa_make = row["Make_Name"]
+            if epa_make not in make_cache:
+                make_cache[epa_make] = makes.match(make_key(epa_make))
+            nhtsa_make = make_cache[epa_make]
+
+            key = model_key(row["Model_Name"])
+            if nhtsa_make is not None:
+                make_id, make_name = nhtsa_make
+                year_models = models.get((make_id, int(row["Year"])))
+                if year_models is not None and _match_model(year_models, key):
+                    stats["duplicates"] += 1
+                    continue
+                stats["matched_make"] += 1
+            else:
+                make_id, make_name = "", epa_make
+
+            writer.write_rows([{
+                "Make_ID": make_id,
+                "Make_Name": make_name,
+                # Stable id so EPA-only models of different makes don't collide in models(model_id, year)
+                "Model_ID": f"EPA-{make_key(make_name)}-{key}",
+                "Model_Name": row["Model_Name"],
+                "Year": row["Year"],
+            }])
+            stats["epa_added"] += 1
+
+    print(f"🔗 Merged {stats['nhtsa']} NHTSA + {stats['epa']} EPA rows: "
+          f"{stats['duplicates']} duplicates dropped, {stats['epa_added']} EPA rows added "
+          f"({stats['matched_make']} under an NHTSA make)")
+    return dict(stats)
+
+
+def _match_model(index: _BlockedIndex, key: str) -> bool:
+    if index.match(key) is not None:
+        return True
+    # EPA appends trims / body styles to the model name
+    tokens = key.split()
+    return any(" ".join(tokens[:n]) in index.exact for n in range(len(tokens) - 1, 0, -1))
+
+
+def build_catalog(out_csv: str = "make_model_year.csv", workers: int = 8,
+                  cache_dir: str = CACHE_DIR, offline: bool = False) -> Dict[str, int]:
+    """
+    One pass over both sources: harvest NHTSA and EPA (cached / replayable offline),
+    then merge them into the canonical CSV that load_csv() reads.
+    """
+    nhtsa_csv, epa_csv = "nhtsa_make_model_year.csv", "epa_make_model_year.csv"
+    nhtsa_combine_makes_and_models(csv_path=nhtsa_csv, json_path=None, workers=workers,
+                                   cache_dir=f"{cache_dir}/nhtsa", offline=offline)
+    epa_combine_makes_and_models(csv_path=epa_csv, workers=workers,
+                                 cache_dir=f"{cache_dir}/epa", offline=offline)
+    return merge_sources(nhtsa_csv, epa_csv, out_csv)
@@ -1,17 +1,20 @@
-import requests
+import os
+from .harvest import cached_get_json, RateLimiter, CACHE_DIR
 
 BASE_URL = "https://vpic.nhtsa.dot.gov/api/vehicles"
+NHTSA_CACHE_DIR = os.path.join(CACHE_DIR, "nhtsa")
 
-def fetch_all_makes():
+# Shared by all harvesting threads, so concurrency never hammers the API
+limiter = RateLimiter(per_second=10)
+
+def fetch_all_makes(cache_dir=NHTSA_CACHE_DIR, offline=False):
     """Fetch all vehicle makes"""
     url = f"{BASE_URL}/GetAllMakes?format=json"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json().get("Results", [])
+    data = cached_get_json(url, cache_dir, offline=offline, limiter=limiter)
+    return (data or {}).get("Results", [])
 
-def fetch_models_for_make_year(make_id, year):
+def fetch_models_for_make_year(make_id, year, cache_dir=NHTSA_CACHE_DIR, offline=False):
     """Fetch all models for a given make_id and year"""
     url = f"{BASE_URL}/GetModelsForMakeIdYear/makeId/{make_id}/modelyear/{year}?format=json"
-    response = requests.get(url)
-    response.raise_for_status()
-    return response.json().get("Results", [])
+    data = cached_get_json(url, cache_dir, offline=offline, limiter=limiter)
+    return (data or {}).get("Results", [])
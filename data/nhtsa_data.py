@@ -1,50 +1,36 @@
-import json
-import csv
-import time
 import datetime
-from .nhtsa_api import fetch_all_makes, fetch_models_for_make_year
-
-def nhtsa_combine_makes_and_models():
-    all_data = []
-    makes = fetch_all_makes()
+from .nhtsa_api import fetch_all_makes, fetch_models_for_make_year, NHTSA_CACHE_DIR
+from .harvest import IncrementalWriter, run_harvest
+
+FIRST_YEAR = 1981
+
+def nhtsa_combine_makes_and_models(csv_path="make_model_year.csv", json_path="make_model_year.json",
+                                   workers=8, cache_dir=NHTSA_CACHE_DIR, offline=False):
+    """
+    Fetch every (make, year) model list from NHTSA on a thread pool and write rows
+    to CSV/JSON as they arrive. Responses are cached, so a re-run resumes for free.
+    """
+    makes = fetch_all_makes(cache_dir=cache_dir, offline=offline)
     print(f"✅ Total makes fetched: {len(makes)}")
 
     current_year = datetime.datetime.now().year
-    years = range(1981, current_year + 1)
-
-    for make in makes:
-        make_id = make["Make_ID"]
-        make_name = make["Make_Name"]
-
-        for year in years:
-            print(f"Fetching models for {make_name} ({make_id}) in {year}")
-            try:
-                models = fetch_models_for_make_year(make_id, year)
-                if models:
-                    for m in models:
-                        all_data.append({
-                            "Make_ID": make_id,
-                            "Make_Name": make_name,
-                            "Model_ID": m.get("Model_ID"),
-                            "Model_Name": m.get("Model_Name"),
-                            "Year": year
-                        })
-                # avoid hammering the API
-                time.sleep(0.1)
-            except Exception as e:
-                print(f"⚠️ Error fetching {make_name} ({make_id}) for {year}: {e}")
-
-    # Save JSON
-    with open("make_model_year.json", "w") as f:
-        json.dump(all_data, f, indent=2)
-    print(f"📄 Saved JSON with {len(all_data)} records")
-
-    # Save CSV
-    with open("make_model_year.csv", "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["Make_ID", "Make_Name", "Model_ID", "Model_Name", "Year"])
-        writer.writeheader()
-        writer.writerows(all_data)
-    print(f"📄 Saved CSV with {len(all_data)} records")
-
+    tasks = [(make["Make_ID"], make["Make_Name"], year)
+             for make in makes for year in range(FIRST_YEAR, current_year + 1)]
+
+    def fetch(task):
+        make_id, make_name, year = task
+        models = fetch_models_for_make_year(make_id, year, cache_dir=cache_dir, offline=offline)
+        return [{
+            "Make_ID": make_id,
+            "Make_Name": make_name,
+            "Model_ID": m.get("Model_ID"),
+            "Model_Name": m.get("Model_Name"),
+            "Year": year
+        } for m in models]
+
+    with IncrementalWriter(csv_path, json_path) as writer:
+        failures = run_harvest(tasks, fetch, writer, workers=workers, desc="NHTSA")
+
+    print(f"📄 Saved CSV/JSON with {writer.count} records ({failures} failed requests)")
     print("🎉 Done!")
-
+    return writer.count
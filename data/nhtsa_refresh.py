@@ -0,0 +1,153 @@
+import datetime
+from collections import defaultdict
+from database.db import get_connection, init_db
+from database.load_csv import normalize_make, normalize_model
+from .nhtsa_api import fetch_all_makes, fetch_models_for_make_year
+from .nhtsa_data import FIRST_YEAR
+from .harvest import run_harvest
+
+MAX_AGE_DAYS = 90
+
+
+def seed_fetch_log(conn, fetched_at):
+    """
+    Mark every (make_id, year) already in models as fetched, so the first delta refresh
+    after a full CSV load does not treat the whole catalog as new.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT OR IGNORE INTO fetch_log (make_id, year, fetched_at, model_count)
+        SELECT make_id, year, ?, COUNT(*) FROM models GROUP BY make_id, year
+    """, (fetched_at,))
+    conn.commit()
+    return cur.rowcount
+
+
+def plan_refresh(conn, makes, now, max_age_days=MAX_AGE_DAYS, lookahead_years=1):
+    """
+    Decide which (make_id, make_name, year) pairs to re-fetch:
+    - every year of makes not in the catalog yet,
+    - the current and upcoming model years of every make,
+    - entries whose last fetch is older than max_age_days.
+    """
+    cur = conn.cursor()
+    known = {row[0] for row in cur.execute("SELECT make_id FROM makes")}
+    names = {str(m["Make_ID"]): m["Make_Name"] for m in makes}
+    last_year = now.year + lookahead_years
+
+    tasks = set()
+    for make_id, make_name in names.items():
+        years = range(FIRST_YEAR, last_year + 1) if make_id not in known else range(now.year, last_year + 1)
+        tasks.update((make_id, make_name, year) for year in years)
+
+    cutoff = (now - datetime.timedelta(days=max_age_days)).isoformat()
+    for make_id, year in cur.execute("SELECT make_id, year FROM fetch_log WHERE fetched_at < ?", (cutoff,)):
+        if make_id in names:
+            tasks.add((make_id, names[make_id], year))
+    return sorted(tasks, key=lambda t: (t[2], t[0]))
+
+
+class _DeltaApplier:
+    """
+    Applies fetched (make, year) model lists to SQLite as upserts and records each
+    insert/update/delete in change_log. Runs on the harvesting thread that owns the connection.
+    """
+
+    def __init__(self, conn, now):
+        self.conn = conn
+        self.now = now.isoformat()
+        self.stats = defaultdict(int)
+
+    def write_rows(self, results):
+        cur = self.conn.cursor()
+        for make_id, make_name, year, api_models in results:
+            make_id, make_name, data_source = normalize_make(make_id, make_name)
+            previous = cur.execute("SELECT make_name FROM makes WHERE make_id = ?", (make_id,)).fetchone()
+            cur.execute("""
+                INSERT INTO makes (make_id, make_name, data_source) VALUES (?, ?, ?)
+                ON CONFLICT(make_id) DO UPDATE SET make_name = excluded.make_name
+            """, (make_id, make_name, data_source))
+
+            existing = dict(cur.execute(
+                "SELECT model_id, model_name FROM models WHERE make_id = ? AND year = ?", (make_id, year)
+            ).fetchall())
+            fetched = dict(normalize_model(str(m.get("Model_ID") or ""), m.get("Model_Name") or "")
+                           for m in api_models)
+
+            changes = []
+            for model_id, model_name in fetched.items():
+                if model_id not in existing:
+                    changes.append(("insert", model_id))
+                elif existing[model_id] != model_name:
+                    changes.append(("update", model_id))
+            # An empty answer is more likely a hiccup than a make losing every model
+            if fetched:
+                changes.extend(("delete", model_id) for model_id in existing if model_id not in fetched)
+
+            cur.executemany("""
+                INSERT INTO models (model_id, model_name, make_id, year) VALUES (?, ?, ?, ?)
+                ON CONFLICT(model_id, year) DO UPDATE SET model_name = excluded.model_name,
+                                                          make_id = excluded.make_id
+            """, [(model_id, name, make_id, year) for model_id, name in fetched.items()
+                  if model_id not in existing or existing[model_id] != name])
+            cur.executemany("DELETE FROM models WHERE model_id = ? AND year = ?",
+                            [(model_id, year) for op, model_id in changes if op == "delete"])
+
+            logged = [(op, model_id, year) for op, model_id in changes]
+            if previous is not None and previous[0] != make_name:
+                # Every document of the make carries its name, in all years, not just this one
+                changed = {model_id for _, model_id in changes}
+                logged.extend(("update", model_id, model_year) for model_id, model_year in cur.execute(
+                    "SELECT model_id, year FROM models WHERE make_id = ?", (make_id,)
+                ).fetchall() if not (model_year == year and model_id in changed))
+            cur.executemany(
+                "INSERT INTO change_log (op, model_id, make_id, year, changed_at) VALUES (?, ?, ?, ?, ?)",
+                [(op, model_id, make_id, model_year, self.now) for op, model_id, model_year in logged]
+            )
+            cur.execute("""
+                INSERT INTO fetch_log (make_id, year, fetched_at, model_count) VALUES (?, ?, ?, ?)
+                ON CONFLICT(make_id, year) DO UPDATE SET fetched_at = excluded.fetched_at,
+                                                         model_count = excluded.model_count
+            """, (make_id, year, self.now, len(fetched)))
+
+            for op, _, _ in logged:
+                self.stats[op] += 1
+            self.stats["fetched"] += 1
+        self.conn.commit()
+
+
+def refresh_nhtsa(max_age_days=MAX_AGE_DAYS, lookahead_years=1, workers=8):
+    """
+    Delta refresh of the NHTSA catalog in vehicle.db.
+
+    Only new makes, the current/next model years and stale (make, year) entries are
+    re-fetched (bypassing the response cache). Changes are applied as upserts and
+    logged in change_log, which es_module.indexing.apply_changes and
+    data.embeddings.quadrant.apply_changes consume to update only affected documents.
+
+    Returns:
+        Dict with counts of fetched pairs and inserted/updated/deleted models
+    """
+    init_db()
+    now = datetime.datetime.now()
+    conn = get_connection()
+    seeded = seed_fetch_log(conn, now.isoformat())
+    if seeded:
+        print(f"🌱 Seeded fetch_log with {seeded} (make, year) pairs from the existing catalog")
+
+    makes = fetch_all_makes(cache_dir=None)
+    tasks = plan_refresh(conn, makes, now, max_age_days=max_age_days, lookahead_years=lookahead_years)
+    print(f"🔄 Refreshing {len(tasks)} (make, year) pairs out of {len(makes)} makes")
+
+    def fetch(task):
+        make_id, make_name, year = task
+        return [(make_id, make_name, year, fetch_models_for_make_year(make_id, year, cache_dir=None))]
+
+    applier = _DeltaApplier(conn, now)
+    failures = run_harvest(tasks, fetch, applier, workers=workers, desc="NHTSA delta")
+    conn.close()
+
+    stats = dict(applier.stats, failed=failures)
+    print(f"✅ Delta refresh: {stats.get('insert', 0)} inserted, {stats.get('update', 0)} updated, "
+          f"{stats.get('delete', 0)} deleted ({failures} failed requests)")
+    return stats
@@ -0,0 +1,105 @@
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from .noise import MAKE_ABBR_MAP
+
+# Abbreviations shared by more makes than this are too ambiguous to expand
+MAX_AMBIGUITY = 5
+
+
+def build_alias_table(abbr_map: Dict[str, str] = MAKE_ABBR_MAP) -> Dict[str, List[str]]:
+    """
+    Invert MAKE_ABBR_MAP into abbreviation -> [make names], lowercased.
+    Several makes can share an abbreviation (e.g. "amer"), so values are lists.
+    """
+    table = defaultdict(list)
+    for make_name, abbr in abbr_map.items():
+        if abbr and str(abbr) != make_name:
+            table[str(abbr).lower()].append(make_name.lower())
+    return dict(table)
+
+
+class AbbreviationResolver:
+    """
+    Token trie over make names and their abbreviations.
+
+    Scanning a query walks the trie from each token and keeps the longest match,
+    so lookup cost depends on query length, not on the size of the alias table.
+    """
+
+    def __init__(self, abbr_map: Dict[str, str] = MAKE_ABBR_MAP):
+        self._root = {}
+        for abbr, makes in build_alias_table(abbr_map).items():
+            self._insert(abbr.split(), makes, is_abbr=True)
+        for make_name in abbr_map:
+            self._insert(make_name.lower().split(), [make_name.lower()], is_abbr=False)
+
+    def _insert(self, tokens: List[str], makes: List[str], is_abbr: bool):
+        if not tokens:
+            return
+        node = self._root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        entry = node.setdefault(None, {"makes": [], "is_abbr": is_abbr})
+        entry["makes"].extend(m for m in makes if m not in entry["makes"])
+        # A string that is also a real make name is never rewritten
+        if not is_abbr:
+            entry["is_abbr"] = False
+
+    def find(self, query: str) -> List[Tuple[int, int, List[str], bool]]:
+        """
+        Find make aliases in a query.
+        Returns (start_token, end_token, makes, is_abbr) spans, longest match first, non-overlapping.
+        """
+        tokens = query.lower().split()
+        spans = []
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            match: Optional[Tuple[int, dict]] = None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if None in node:
+                    match = (j, node[None])
+            if match:
+                end, entry = match
+                spans.append((i, end, entry["makes"], entry["is_abbr"]))
+                i = end
+            else:
+                i += 1
+        return spans
+
+    def rewrite(self, query: str) -> str:
+        """
+        Replace an unambiguous make abbreviation with the full (lowercased) make name.
+
+        A query names one make, so only the first abbreviation is expanded, and nothing
+        is rewritten if a full make name is already present (the remaining "abbreviations"
+        are then most likely model tokens).
+        """
+        tokens = query.lower().split()
+        spans = self.find(query)
+        if any(not is_abbr for _, _, _, is_abbr in spans):
+            return " ".join(tokens)
+        for start, end, makes, _ in spans:
+            if len(makes) == 1:
+                tokens[start:end] = makes[0].split()
+                break
+        return " ".join(tokens)
+
+
+_resolver: Optional[AbbreviationResolver] = None
+
+
+def get_resolver() -> AbbreviationResolver:
+    """Build the shared resolver on first use."""
+    global _resolver
+    if _resolver is None:
+        _resolver = AbbreviationResolver()
+    return _resolver
+
+
+def rewrite_query(query: str) -> str:
+    """Rewrite make abbreviations in a query before it is sent to a search engine."""
+    return get_resolver().rewrite(query)
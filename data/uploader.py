@@ -0,0 +1,199 @@
+import json
+import os
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEAD_LETTER_DIR = os.environ.get("VEHICLE_DEAD_LETTER_DIR", "dead_letters")
+# Concurrent bulk requests per uploader
+MAX_IN_FLIGHT = int(os.environ.get("VEHICLE_UPLOAD_IN_FLIGHT", 2))
+# Rejections (429) and gateway/overload errors are worth retrying; other 4xx are not
+RETRY_STATUSES = (429, 502, 503, 504)
+
+# send_fn(batch) returns the items that failed, as (item, retryable, error) tuples,
+# raises RetryableError for whole-request failures worth retrying (429, timeouts) and
+# BatchTooLargeError when the server rejects the request size (413); any other
+# exception dead-letters the batch
+Failure = Tuple[dict, bool, str]
+
+
+def _to_json(value):
+    # NumPy vectors are only converted when an item actually has to be written out
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class RetryableError(Exception):
+    """A whole bulk request failed in a way that may succeed later (rejection, timeout)."""
+
+
+class BatchTooLargeError(Exception):
+    """The server rejected the request body as too large (HTTP 413)."""
+
+
+class AdaptiveBatchSize:
+    """
+    Byte budget per request, adjusted from feedback (AIMD): grow while requests are
+    fast and accepted, halve on a rejection or when latency exceeds the target.
+    """
+
+    def __init__(self, initial_bytes: int = 1 << 20, min_bytes: int = 64 << 10, max_bytes: int = 16 << 20,
+                 target_latency: float = 1.0):
+        self.bytes = initial_bytes
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, rejected: bool):
+        with self._lock:
+            if rejected or latency > self.target_latency:
+                self.bytes = max(self.min_bytes, self.bytes // 2)
+            elif latency < self.target_latency / 2:
+                self.bytes = min(self.max_bytes, int(self.bytes * 1.25))
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff, so retrying workers don't hit the server in lockstep."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class BulkUploader:
+    """
+    Upload items through send_fn in byte-sized batches with bounded concurrency.
+
+    Batches are cut by the adaptive byte budget (and max_items); at most max_in_flight
+    requests run at once, so a slow server holds back reading new items instead of
+    piling them up in memory. Retryable failures are re-sent with jittered backoff, and
+    a batch rejected as too large halves the budget and is re-sent in two halves.
+    Items that still fail (or fail permanently, including whole-request errors such as
+    a 400) go to a JSONL dead-letter file that read_dead_letters() replays; an upload
+    never aborts on a server error.
+    """
+
+    def __init__(self, name: str, send_fn: Callable[[List[dict]], List[Failure]],
+                 size_fn: Callable[[dict], int] = lambda item: len(json.dumps(item)),
+                 max_items: int = 1000, max_in_flight: int = MAX_IN_FLIGHT, max_retries: int = 5,
+                 batch_size: Optional[AdaptiveBatchSize] = None, dead_letter_dir: str = DEAD_LETTER_DIR):
+        self.name = name
+        self.send_fn = send_fn
+        self.size_fn = size_fn
+        self.max_items = max_items
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.batch_size = batch_size or AdaptiveBatchSize()
+        self.dead_letter_path = os.path.join(dead_letter_dir, f"{name}.jsonl")
+        self.stats = {"sent": 0, "retries": 0, "dead_lettered": 0, "requests": 0}
+        self._lock = threading.Lock()
+
+    def _batches(self, items: Iterable[dict]) -> Iterator[List[dict]]:
+        batch, size = [], 0
+        for item in items:
+            item_size = self.size_fn(item)
+            if batch and (size + item_size > self.batch_size.bytes or len(batch) >= self.max_items):
+                yield batch
+                batch, size = [], 0
+            batch.append(item)
+            size += item_size
+        if batch:
+            yield batch
+
+    def _send(self, batch: List[dict]):
+        pending = batch
+        for attempt in range(self.max_retries + 1):
+            start = time.monotonic()
+            try:
+                failures = self.send_fn(pending)
+                error = None
+            except BatchTooLargeError as e:
+                self.batch_size.record(time.monotonic() - start, rejected=True)
+                self._count_request()
+                if len(pending) == 1:
+                    self._dead_letter([(pending[0], False, str(e))])
+                    return
+                half = len(pending) // 2
+                self._send(pending[:half])
+                self._send(pending[half:])
+                return
+            except RetryableError as e:
+                failures = [(item, True, str(e)) for item in pending]
+                error = e
+            except Exception as e:
+                # A permanent whole-request error (400, auth, mapping): keep the items, not the crash
+                self._count_request()
+                self._dead_letter([(item, False, f"{type(e).__name__}: {e}") for item in pending])
+                return
+            retryable = [f for f in failures if f[1]]
+            self.batch_size.record(time.monotonic() - start, rejected=error is not None or bool(retryable))
+
+            self._count_request(sent=len(pending) - len(failures))
+            self._dead_letter([f for f in failures if not f[1]])
+            if not retryable:
+                return
+            pending = [item for item, _, _ in retryable]
+            if attempt < self.max_retries:
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(backoff_delay(attempt))
+        self._dead_letter(retryable)
+
+    def _count_request(self, sent: int = 0):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["sent"] += sent
+
+    def _dead_letter(self, failures: List[Failure]):
+        if not failures:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(self.dead_letter_path) or ".", exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                for item, _, error in failures:
+                    f.write(json.dumps({"error": error, "item": item}, default=_to_json) + "\n")
+            self.stats["dead_lettered"] += len(failures)
+
+    def upload(self, items: Iterable[dict]) -> Dict[str, int]:
+        """Send every item; returns counts of sent, retried, dead-lettered items and requests."""
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            in_flight = set()
+            for batch in self._batches(items):
+                if len(in_flight) >= self.max_in_flight:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                in_flight.add(pool.submit(self._send, batch))
+            for future in in_flight:
+                future.result()
+
+        if self.stats["dead_lettered"]:
+            print(f"⚠️  {self.stats['dead_lettered']} items failed; written to {self.dead_letter_path} for replay")
+        return dict(self.stats)
+
+
+def claim_dead_letters(path: str) -> Optional[str]:
+    """
+    Move a dead-letter file aside for replay and return the path to replay from, or None
+    when there is nothing to replay. A ".replaying" file left by an interrupted replay is
+    resumed, with any newer dead letters appended to it rather than overwriting it.
+    """
+    replay = path + ".replaying"
+    if os.path.exists(path):
+        if os.path.exists(replay):
+            with open(replay, "a", encoding="utf-8") as out, open(path, encoding="utf-8") as f:
+                shutil.copyfileobj(f, out)
+            os.remove(path)
+        else:
+            os.replace(path, replay)
+    return replay if os.path.exists(replay) else None
+
+
+def read_dead_letters(path: str) -> Iterator[dict]:
+    """Items from a dead-letter file, ready to feed back into BulkUploader.upload()."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)["item"]
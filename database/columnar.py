@@ -0,0 +1,273 @@
+import itertools
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from .db import get_connection
+
+COLUMNAR_DIR = os.environ.get("VEHICLE_COLUMNAR_DIR", "columnar")
+FETCH_SIZE = 50000
+# Sort order of the exported catalog, recorded in its schema metadata; it keeps each
+# (make, model) family's rows adjacent so families can be grouped one record batch at a time
+CATALOG_ORDER = b"make_id,model_name,year,model_id"
+
+# name -> (query, schema, low-cardinality string columns to dictionary-encode)
+TABLES: Dict[str, Tuple[str, pa.Schema, List[str]]] = {
+    "makes": (
+        "SELECT make_id, make_name, data_source FROM makes",
+        pa.schema([("make_id", pa.string()), ("make_name", pa.string()), ("data_source", pa.string())]),
+        ["data_source"],
+    ),
+    "models": (
+        "SELECT model_id, model_name, make_id, year FROM models",
+        pa.schema([("model_id", pa.string()), ("model_name", pa.string()),
+                   ("make_id", pa.string()), ("year", pa.int32())]),
+        ["model_name", "make_id"],
+    ),
+    # Labeled with canonical names so the evaluator does not need the catalog to score results
+    "noisy_variants": (
+        """
+        SELECT nv.id, nv.noisy_string, nv.model_id, nv.make_id, nv.year, nv.noise_type,
+               mk.make_name, m.model_name
+        FROM noisy_variants nv
+        LEFT JOIN models m ON m.model_id = nv.model_id AND m.year = nv.year
+        LEFT JOIN makes mk ON mk.make_id = nv.make_id
+        ORDER BY nv.id
+        """,
+        pa.schema([("id", pa.int64()), ("noisy_string", pa.string()), ("model_id", pa.string()),
+                   ("make_id", pa.string()), ("year", pa.int32()), ("noise_type", pa.string()),
+                   ("make_name", pa.string()), ("model_name", pa.string())]),
+        ["model_id", "make_id", "noise_type", "make_name", "model_name"],
+    ),
+    # The canonical joined view the indexers consume (same rows as fetch_canonical_models)
+    "catalog": (
+        """
+        SELECT mk.make_name, m.model_name, m.year, m.make_id, m.model_id
+        FROM models m
+        JOIN makes mk ON m.make_id = mk.make_id
+        WHERE m.model_name != mk.make_name
+        ORDER BY m.make_id, m.model_name, m.year, m.model_id
+        """,
+        pa.schema([("make_name", pa.string()), ("model_name", pa.string()), ("year", pa.int32()),
+                   ("make_id", pa.string()), ("model_id", pa.string())],
+                  metadata={b"sorted_by": CATALOG_ORDER}),
+        ["make_name", "model_name", "make_id"],
+    ),
+}
+
+# Columns written back to SQLite on import
+IMPORT_COLUMNS = {
+    "makes": ["make_id", "make_name", "data_source"],
+    "models": ["model_id", "model_name", "make_id", "year"],
+    "noisy_variants": ["id", "noisy_string", "model_id", "make_id", "year", "noise_type"],
+}
+
+
+def _read_sqlite_table(name: str) -> pa.Table:
+    """Stream a SQLite query into Arrow record batches, then dictionary-encode repeated strings."""
+    query, schema, dictionary_columns = TABLES[name]
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(query)
+
+    batches = []
+    while True:
+        rows = cur.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        batches.append(pa.RecordBatch.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+            schema=schema,
+        ))
+    conn.close()
+
+    table = pa.Table.from_batches(batches, schema=schema)
+    for column in dictionary_columns:
+        idx = table.schema.get_field_index(column)
+        table = table.set_column(idx, column, pc.dictionary_encode(table[column]))
+    # The IPC file format allows one dictionary per column, so share it across chunks
+    return table.unify_dictionaries()
+
+
+def export_tables(out_dir: str = COLUMNAR_DIR, names: Optional[List[str]] = None) -> Dict[str, int]:
+    """
+    Export catalog tables from vehicle.db to Parquet (compact, for storage/transfer)
+    and Arrow IPC (uncompressed, for memory-mapped zero-copy loads).
+
+    Returns:
+        Dict of table name -> row count
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    counts = {}
+    for name in names or list(TABLES):
+        table = _read_sqlite_table(name)
+        pq.write_table(table, os.path.join(out_dir, f"{name}.parquet"), use_dictionary=True)
+        with pa.OSFile(os.path.join(out_dir, f"{name}.arrow"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        counts[name] = table.num_rows
+        print(f"📦 Exported {name}: {table.num_rows} rows")
+    return counts
+
+
+def open_table(name: str, in_dir: str = COLUMNAR_DIR) -> pa.Table:
+    """
+    Open an exported table. Arrow IPC files are memory-mapped, so column buffers are
+    read lazily from the page cache and shared between processes; Parquet is the fallback.
+    """
+    arrow_path = os.path.join(in_dir, f"{name}.arrow")
+    if os.path.exists(arrow_path):
+        return pa.ipc.open_file(pa.memory_map(arrow_path, "r")).read_all()
+    return pq.read_table(os.path.join(in_dir, f"{name}.parquet"), memory_map=True)
+
+
+def has_table(name: str, in_dir: str = COLUMNAR_DIR) -> bool:
+    return any(os.path.exists(os.path.join(in_dir, f"{name}{ext}")) for ext in (".arrow", ".parquet"))
+
+
+def import_tables(in_dir: str = COLUMNAR_DIR, batch_size: int = FETCH_SIZE) -> Dict[str, int]:
+    """
+    Load exported makes/models/noisy_variants back into vehicle.db (existing rows are kept).
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    counts = {}
+    for name, columns in IMPORT_COLUMNS.items():
+        if not has_table(name, in_dir):
+            continue
+        table = open_table(name, in_dir).select(columns)
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT OR IGNORE INTO {name} ({', '.join(columns)}) VALUES ({placeholders})"
+        for batch in table.to_batches(max_chunksize=batch_size):
+            cur.executemany(sql, zip(*(batch.column(c).to_pylist() for c in columns)))
+        conn.commit()
+        counts[name] = table.num_rows
+        print(f"📥 Imported {name}: {table.num_rows} rows")
+    conn.close()
+    return counts
+
+
+def _iter_rows(table: pa.Table, columns: List[str], chunk_size: int):
+    """Yield row tuples one record batch at a time, so only chunk_size rows are ever decoded."""
+    for batch in table.select(columns).to_batches(max_chunksize=chunk_size):
+        yield from zip(*(batch.column(c).to_pylist() for c in columns))
+
+
+def iter_canonical_models(limit: Optional[int] = None, offset: int = 0, with_ids: bool = False,
+                          chunk_size: int = FETCH_SIZE, in_dir: str = COLUMNAR_DIR):
+    """Same rows as db.iter_canonical_models, streamed from the memory-mapped catalog."""
+    table = open_table("catalog", in_dir).slice(offset, limit)
+    columns = ["make_name", "model_name", "year"] + (["make_id", "model_id"] if with_ids else [])
+    yield from _iter_rows(table, columns, chunk_size)
+
+
+def iter_model_families(limit: Optional[int] = None, offset: int = 0,
+                        chunk_size: int = FETCH_SIZE, in_dir: str = COLUMNAR_DIR):
+    """
+    Same rows as db.iter_model_families, streamed from the memory-mapped catalog. The export is
+    sorted by CATALOG_ORDER, so a family is the run of adjacent rows sharing (make_id, model_name)
+    and is grouped as record batches are decoded, carrying over batch boundaries.
+    """
+    table = open_table("catalog", in_dir)
+    if (table.schema.metadata or {}).get(b"sorted_by") != CATALOG_ORDER:
+        raise ValueError(f"The catalog export in {in_dir} is not sorted into families; re-run export_tables")
+    rows = _iter_rows(table, ["make_id", "model_name", "make_name", "year", "model_id"], chunk_size)
+    families = itertools.groupby(rows, key=lambda row: row[:2])
+    stop = None if limit is None else offset + limit
+    for (make_id, model_name), family in itertools.islice(families, offset, stop):
+        family = list(family)
+        yield family[0][2], model_name, make_id, [(year, model_id) for _, _, _, year, model_id in family]
+
+
+def read_canonical_models(limit: int = 1000, offset: int = 0, with_ids: bool = False,
+                          in_dir: str = COLUMNAR_DIR):
+    """Same rows as db.fetch_canonical_models, sliced from the memory-mapped catalog."""
+    return list(iter_canonical_models(limit=limit, offset=offset, with_ids=with_ids, in_dir=in_dir))
+
+
+def iter_labeled_noisy_variants(limit: Optional[int] = None, offset: int = 0,
+                                chunk_size: int = FETCH_SIZE, in_dir: str = COLUMNAR_DIR):
+    """Same rows as db.iter_labeled_noisy_variants, streamed from the memory-mapped export."""
+    table = open_table("noisy_variants", in_dir)
+    table = table.filter(pc.is_valid(table["model_name"])).slice(offset, limit)
+    columns = ["noisy_string", "make_name", "model_name", "year", "noise_type"]
+    yield from _iter_rows(table, columns, chunk_size)
+
+
+def read_labeled_noisy_variants(limit: int = 30, offset: int = 0, in_dir: str = COLUMNAR_DIR):
+    """Same rows as db.get_labeled_noisy_variants, sliced from the memory-mapped export."""
+    return list(iter_labeled_noisy_variants(limit=limit, offset=offset, in_dir=in_dir))
+
+
+def export_embeddings(embeddings: np.ndarray, ids: List[str], path: str):
+    """
+    Write an (n x d) float32 embedding matrix and its point ids as one Arrow IPC record batch.
+    The vectors become a FixedSizeList column wrapping the NumPy buffer without a copy.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    vectors = pa.FixedSizeListArray.from_arrays(pa.array(embeddings.reshape(-1)), embeddings.shape[1])
+    batch = pa.RecordBatch.from_arrays([pa.array(ids, type=pa.string()), vectors], names=["id", "vector"])
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+
+
+class EmbeddingWriter:
+    """
+    Append (ids, n x d matrix) chunks to an Arrow IPC file as separate record batches,
+    so a streaming build never holds the whole matrix. Same layout as export_embeddings,
+    plus make/model/year labels so local matchers can serve results from the file alone.
+    """
+
+    def __init__(self, path: str, dim: int):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.schema = pa.schema([("id", pa.string()), ("vector", pa.list_(pa.float32(), dim)),
+                                 ("make", pa.string()), ("model", pa.string()), ("year", pa.int32())])
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, embeddings: np.ndarray, ids: List[str], payloads: Optional[List[dict]] = None):
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        vectors = pa.FixedSizeListArray.from_arrays(pa.array(embeddings.reshape(-1)), embeddings.shape[1])
+        payloads = payloads or [{}] * len(ids)
+        self._writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(ids, type=pa.string()), vectors]
+            + [pa.array([p.get(key) for p in payloads], type=field.type)
+               for key, field in zip(("make", "model", "year"), list(self.schema)[2:])],
+            schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_embedding_table(path: str):
+    """
+    Memory-map an embedding file written by export_embeddings or EmbeddingWriter.
+    Returns (table, matrix) where matrix is a read-only zero-copy view of the file
+    (files written in several chunks are copied into one matrix).
+    """
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    vectors = table["vector"]
+    dim = vectors.type.list_size
+    if vectors.num_chunks == 1:
+        matrix = vectors.chunk(0).flatten().to_numpy(zero_copy_only=True).reshape(-1, dim)
+    else:
+        matrix = np.concatenate([c.flatten().to_numpy(zero_copy_only=True) for c in vectors.chunks]).reshape(-1, dim)
+    return table, matrix
+
+
+def load_embeddings(path: str):
+    """Returns (ids, matrix) of an embedding file; see load_embedding_table."""
+    table, matrix = load_embedding_table(path)
+    return table["id"], matrix
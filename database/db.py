@@ -1,7 +1,15 @@
+import os
 import sqlite3
+from .streaming import MEMORY_LIMIT_MB, ROW_BYTES, chunk_rows
 
 DB_NAME = "vehicle.db"
 
+# "columnar" serves the catalog and noisy variants from the memory-mapped
+# Arrow exports (see database/columnar.py) instead of querying SQLite
+CATALOG_SOURCE = os.environ.get("VEHICLE_CATALOG_SOURCE", "sqlite")
+# Rows per cursor.fetchmany() when streaming, within a quarter of the memory ceiling
+FETCH_SIZE = min(10000, chunk_rows(ROW_BYTES, MEMORY_LIMIT_MB // 4))
+
 def get_connection():
     return sqlite3.connect(DB_NAME)
 
@@ -10,6 +18,9 @@ def init_db(reset=False):
     cur = conn.cursor()
 
     if reset:
+        cur.execute("DROP TABLE IF EXISTS sync_state;")
+        cur.execute("DROP TABLE IF EXISTS change_log;")
+        cur.execute("DROP TABLE IF EXISTS fetch_log;")
         cur.execute("DROP TABLE IF EXISTS noisy_variants;")
         cur.execute("DROP TABLE IF EXISTS models;")
         cur.execute("DROP TABLE IF EXISTS makes;")
@@ -46,27 +57,115 @@ def init_db(reset=False):
     );
     """)
 
+    # When each (make_id, year) was last fetched from NHTSA, for delta refreshes
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS fetch_log (
+        make_id TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        fetched_at TEXT NOT NULL,
+        model_count INTEGER NOT NULL,
+        PRIMARY KEY (make_id, year)
+    );
+    """)
+
+    # Every model row a refresh inserted, updated or deleted, in order
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS change_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        model_id TEXT NOT NULL,
+        make_id TEXT NOT NULL,
+        year INTEGER NOT NULL,
+        changed_at TEXT NOT NULL
+    );
+    """)
+
+    # Last change_log id each consumer (index) has applied
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sync_state (
+        consumer TEXT PRIMARY KEY,
+        last_change_id INTEGER NOT NULL
+    );
+    """)
+
     conn.commit()
     conn.close()
 
 
-def fetch_canonical_models(limit=1000, offset=0):
+def iter_canonical_models(limit=None, offset=0, with_ids=False, chunk_size=FETCH_SIZE):
+    """
+    Stream canonical (make_name, model_name, year[, make_id, model_id]) rows,
+    fetching chunk_size rows at a time; limit=None streams the whole catalog.
+    """
+    if CATALOG_SOURCE == "columnar":
+        from .columnar import iter_canonical_models as iter_columnar
+        yield from iter_columnar(limit=limit, offset=offset, with_ids=with_ids, chunk_size=chunk_size)
+        return
+
+    conn = get_connection()
+    cur = conn.cursor()
+    columns = "mk.make_name, m.model_name, m.year" + (", m.make_id, m.model_id" if with_ids else "")
+    cur.execute(f"""
+        SELECT {columns}
+        FROM models m
+        JOIN makes mk ON m.make_id = mk.make_id
+        WHERE m.model_name != mk.make_name
+        LIMIT ? OFFSET ?
+    """, (-1 if limit is None else limit, offset))
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+            del rows  # Release this chunk before fetching the next
+    finally:
+        conn.close()
+
+
+def fetch_canonical_models(limit=1000, offset=0, with_ids=False):
     """
     Fetch canonical model/make/year data from the database with a join, limit, and offset.
     Returns a list of tuples: (make_name, model_name, year)
+    or, with_ids=True: (make_name, model_name, year, make_id, model_id)
+    """
+    return list(iter_canonical_models(limit=limit, offset=offset, with_ids=with_ids))
+
+def iter_model_families(limit=None, offset=0, chunk_size=FETCH_SIZE):
     """
+    Stream the catalog collapsed to one row per (make, model name), with every year it is sold in.
+    Yields tuples: (make_name, model_name, make_id, [(year, model_id), ...]) with years ascending.
+    """
+    if CATALOG_SOURCE == "columnar":
+        from .columnar import iter_model_families as iter_columnar
+        yield from iter_columnar(limit=limit, offset=offset, chunk_size=chunk_size)
+        return
+
     conn = get_connection()
     cur = conn.cursor()
+    # Control characters as separators, so ids containing ':' or '|' survive the round trip
     cur.execute("""
-        SELECT mk.make_name, m.model_name, m.year
+        SELECT mk.make_name, m.model_name, m.make_id,
+               group_concat(m.year || char(31) || m.model_id, char(30))
         FROM models m
         JOIN makes mk ON m.make_id = mk.make_id
         WHERE m.model_name != mk.make_name
+        GROUP BY m.make_id, m.model_name
         LIMIT ? OFFSET ?
-    """, (limit, offset))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    """, (-1 if limit is None else limit, offset))
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            for make_name, model_name, make_id, packed in rows:
+                variants = []
+                for entry in packed.split("\x1e"):
+                    year, _, model_id = entry.partition("\x1f")
+                    variants.append((int(year), model_id))
+                yield make_name, model_name, make_id, sorted(variants)
+    finally:
+        conn.close()
 
 def get_noisy_variants(limit=30, offset=0):
     """
@@ -82,3 +181,93 @@ def get_noisy_variants(limit=30, offset=0):
     """, (limit, offset))
     noisy_variants = cur.fetchall()
     return noisy_variants
+
+def iter_labeled_noisy_variants(limit=None, offset=0, chunk_size=FETCH_SIZE):
+    """
+    Stream noisy variants joined back to their canonical names, chunk_size rows at a time.
+    Yields tuples: (noisy_string, make_name, model_name, year, noise_type)
+    """
+    if CATALOG_SOURCE == "columnar":
+        from .columnar import iter_labeled_noisy_variants as iter_columnar
+        yield from iter_columnar(limit=limit, offset=offset, chunk_size=chunk_size)
+        return
+
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT nv.noisy_string, mk.make_name, m.model_name, nv.year, nv.noise_type
+        FROM noisy_variants nv
+        JOIN models m ON m.model_id = nv.model_id AND m.year = nv.year
+        JOIN makes mk ON mk.make_id = nv.make_id
+        ORDER BY nv.id
+        LIMIT ? OFFSET ?
+    """, (-1 if limit is None else limit, offset))
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+            del rows  # Release this chunk before fetching the next
+    finally:
+        conn.close()
+
+
+def get_labeled_noisy_variants(limit=30, offset=0):
+    """
+    Fetch noisy variants joined back to their canonical names, so they can be
+    compared against search results (which carry make/model names, not ids).
+    Returns a list of tuples: (noisy_string, make_name, model_name, year, noise_type)
+    """
+    return list(iter_labeled_noisy_variants(limit=limit, offset=offset))
+
+
+def get_changes(since_id=0, limit=10000):
+    """
+    Fetch change_log entries after since_id, with the current catalog row for inserts/updates.
+    Returns a list of tuples: (change_id, op, make_id, model_id, year, make_name, model_name)
+    where model_name is None for deletes. Rows the canonical catalog excludes (model_name
+    equal to the make name) come back as deletes, so indexes never pick them up.
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.id,
+               CASE WHEN m.model_name = mk.make_name THEN 'delete' ELSE c.op END,
+               c.make_id, c.model_id, c.year, mk.make_name, NULLIF(m.model_name, mk.make_name)
+        FROM change_log c
+        LEFT JOIN models m ON m.model_id = c.model_id AND m.year = c.year AND c.op != 'delete'
+        LEFT JOIN makes mk ON mk.make_id = c.make_id
+        WHERE c.id > ?
+        ORDER BY c.id
+        LIMIT ?
+    """, (since_id, limit))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+def get_last_change_id():
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM change_log")
+    last_id = cur.fetchone()[0]
+    conn.close()
+    return last_id
+
+def get_sync_state(consumer):
+    """Last change_log id applied by a consumer (0 if it never synced)."""
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT last_change_id FROM sync_state WHERE consumer = ?", (consumer,))
+    row = cur.fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+def set_sync_state(consumer, last_change_id):
+    conn = get_connection()
+    conn.execute("""
+        INSERT INTO sync_state (consumer, last_change_id) VALUES (?, ?)
+        ON CONFLICT(consumer) DO UPDATE SET last_change_id = excluded.last_change_id
+    """, (consumer, last_change_id))
+    conn.commit()
+    conn.close()
@@ -0,0 +1,179 @@
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+from .db import DB_NAME, get_connection, iter_labeled_noisy_variants
+from matching.features import edit_similarity
+from matching.normalize import document_text, normalize_text, parse_query
+
+FTS_TABLE = "catalog_fts"
+
+# bm25 prefilter size before the edit-distance rerank
+CANDIDATES = 50
+# Cap on trigrams per query, so long vendor strings don't turn into huge OR queries
+MAX_TRIGRAMS = 24
+# Read the database through mmap, so matcher processes share one copy in the page cache
+MMAP_SIZE = 1 << 30
+
+
+def trigram_supported() -> bool:
+    """The trigram tokenizer needs SQLite >= 3.34."""
+    try:
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        conn.close()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def build_fts_index(tokenizer: Optional[str] = None) -> int:
+    """
+    (Re)build the FTS5 table over the normalized catalog inside vehicle.db.
+    Uses the trigram tokenizer when available (substring / typo-tolerant candidates),
+    otherwise unicode61 word tokens with prefix indexes.
+
+    Returns the number of indexed rows.
+    """
+    tokenizer = tokenizer or ("trigram" if trigram_supported() else "unicode61")
+    options = "tokenize='trigram'" if tokenizer == "trigram" else "tokenize='unicode61', prefix='2 3'"
+
+    conn = get_connection()
+    conn.create_function("document_text", 3, document_text, deterministic=True)
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    cur.execute(f"""
+        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            normalized_text,
+            make UNINDEXED, model UNINDEXED, year UNINDEXED, model_id UNINDEXED,
+            {options}
+        )
+    """)
+    # Same rows and text as the ES / Qdrant documents, built entirely inside SQLite
+    cur.execute(f"""
+        INSERT INTO {FTS_TABLE} (normalized_text, make, model, year, model_id)
+        SELECT document_text(mk.make_name, m.model_name, m.year),
+               mk.make_name, m.model_name, m.year, m.model_id
+        FROM models m
+        JOIN makes mk ON m.make_id = mk.make_id
+        WHERE m.model_name != mk.make_name
+    """)
+    count = cur.rowcount
+    cur.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+    print(f"✅ Built {FTS_TABLE} ({tokenizer}) with {count} rows")
+    return count
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _sorted_tokens(text: str) -> str:
+    return " ".join(sorted(text.split()))
+
+
+class FtsMatcher:
+    """
+    Local candidate generation with the same interface as es_module.search.search:
+    FTS5 bm25 over trigrams (or word prefixes) as a prefilter, then an edit-distance rerank.
+    """
+
+    def __init__(self, db_path: str = DB_NAME, candidates: int = CANDIDATES, mmap_size: int = MMAP_SIZE):
+        # Read-only and shareable across threads; each process opens its own
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        self.candidates = candidates
+        self.trigram = "trigram" in (self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = ?", (FTS_TABLE,)
+        ).fetchone() or [""])[0]
+
+    def _match_expression(self, tokens: List[str], use_fuzzy: bool) -> Optional[str]:
+        if self.trigram:
+            if not use_fuzzy:
+                terms = [_quote(t) for t in tokens if len(t) >= 3]
+                return " AND ".join(terms) or None
+            grams = []
+            for token in tokens:
+                grams.extend(token[i:i + 3] for i in range(len(token) - 2))
+            grams = list(dict.fromkeys(grams))
+            if len(grams) > MAX_TRIGRAMS:
+                step = len(grams) / MAX_TRIGRAMS
+                grams = [grams[int(i * step)] for i in range(MAX_TRIGRAMS)]
+            return " OR ".join(_quote(g) for g in grams) or None
+        terms = [_quote(t) + ("*" if use_fuzzy else "") for t in tokens]
+        return (" OR " if use_fuzzy else " AND ").join(terms) or None
+
+    def search(self, query: str, top_k: int = 10, use_fuzzy: bool = True) -> List[Dict[str, Any]]:
+        parsed = parse_query(query)
+        year, tokens = parsed.year, list(parsed.tokens)
+
+        expression = self._match_expression(tokens, use_fuzzy)
+        if expression is None:
+            return []
+
+        sql = f"""
+            SELECT rowid, make, model, year, bm25({FTS_TABLE})
+            FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH ?
+        """
+        params = [expression]
+        if year is not None:
+            sql += " AND year = ?"
+            params.append(year)
+        sql += f" ORDER BY bm25({FTS_TABLE}) LIMIT ?"
+        params.append(max(self.candidates, top_k))
+        rows = self.conn.execute(sql, params).fetchall()
+        if not rows:
+            return []
+
+        # Rerank: edit similarity in query order and in sorted-token order (reorder noise),
+        # with bm25 (negative, lower is better) only as a small tiebreaker
+        query_text = " ".join(tokens)
+        query_sorted = _sorted_tokens(query_text)
+        best_bm25 = min(r[4] for r in rows) or -1.0
+        scored = []
+        for rowid, make, model, cand_year, bm25 in rows:
+            candidate = normalize_text(f"{make} {model}")
+            similarity = max(edit_similarity(query_text, candidate),
+                             edit_similarity(query_sorted, _sorted_tokens(candidate)))
+            score = 0.9 * similarity + 0.1 * (bm25 / best_bm25)
+            scored.append((score, rowid, make, model, cand_year))
+        scored.sort(key=lambda r: -r[0])
+
+        return [
+            {"score": round(score, 4), "id": rowid, "make": make, "model": model, "year": cand_year, "stage": "fts"}
+            for score, rowid, make, model, cand_year in scored[:top_k]
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
+_matcher: Optional[FtsMatcher] = None
+
+
+def search(query: str, top_k: int = 10, use_fuzzy: bool = True) -> List[Dict[str, Any]]:
+    """Module-level search on a shared matcher, mirroring es_module.search.search."""
+    global _matcher
+    if _matcher is None:
+        _matcher = FtsMatcher()
+    return _matcher.search(query, top_k=top_k, use_fuzzy=use_fuzzy)
+
+
+def benchmark(limit: int = 2000, k: int = 10) -> Dict[str, float]:
+    """Queries/sec and recall@k of the FTS matcher over noisy variants."""
+    matcher = FtsMatcher()
+    hits = total = 0
+    start = time.perf_counter()
+    for noisy_string, make_name, model_name, year, _ in iter_labeled_noisy_variants(limit=limit):
+        total += 1
+        results = matcher.search(noisy_string, top_k=k)
+        hits += any((r["make"], r["model"], r["year"]) == (make_name, model_name, year) for r in results)
+    elapsed = time.perf_counter() - start
+    matcher.close()
+
+    report = {"queries": total, "qps": round(total / elapsed, 1) if elapsed else 0.0,
+              "recall": round(hits / max(total, 1), 4)}
+    print(f"⚡ FTS matcher: {report['qps']} queries/sec, Recall@{k} {report['recall']} on {report['queries']} queries")
+    return report
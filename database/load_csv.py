@@ -1,15 +1,6 @@
 import csv
 from .db import get_connection
-import re
-
-def clean_string(s):
-    """
-    Strips leading/trailing spaces, removes surrounding quotes, and normalizes whitespace.
-    """
-    s = s.strip()                       # remove leading/trailing spaces
-    s = re.sub(r'^["\']|["\']$', '', s) # remove surrounding quotes
-    s = re.sub(r'\s+', ' ', s)          # collapse multiple spaces
-    return s
+from matching.normalize import clean_name
 
 def normalize_make(make_id, make_name):
     """
@@ -17,11 +8,11 @@ def normalize_make(make_id, make_name):
     - Use NHTSA make_id if available, else fallback to make_name as primary key
     - Clean up name, remove quotes, collapse spaces, convert casing
     """
-    clean_name = clean_string(make_name)
+    name = clean_name(make_name)
     if make_id and make_id.strip() != "":
-        return make_id.strip(), clean_name.upper(), "NHTSA"
+        return make_id.strip(), name.upper(), "NHTSA"
     else:
-        return clean_name.lower(), clean_name.upper(), "EPA"
+        return name.lower(), name.upper(), "EPA"
 
 def normalize_model(model_id, model_name):
     """
@@ -29,11 +20,11 @@ def normalize_model(model_id, model_name):
     - Use NHTSA model_id if available, else fallback to model_name as id
     - Clean up model name, remove quotes, collapse spaces, convert casing
     """
-    clean_name = clean_string(model_name)
+    name = clean_name(model_name)
     if model_id and model_id.strip() != "":
-        return model_id.strip(), clean_name.upper()
+        return model_id.strip(), name.upper()
     else:
-        return clean_name.lower(), clean_name.upper()
+        return name.lower(), name.upper()
 
 def load_csv(csv_file):
     conn = get_connection()
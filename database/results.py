@@ -0,0 +1,294 @@
+import heapq
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from .db import iter_labeled_noisy_variants
+
+# Kept apart from vehicle.db, so rebuilding the catalog (init_db(reset=True)) keeps the history
+RESULTS_DB = os.environ.get("VEHICLE_RESULTS_DB", "results.db")
+
+# Regression thresholds: absolute recall drop, relative p95 increase (ignored below
+# P95_MIN_MS of absolute change, which is timer noise at these latencies)
+RECALL_DROP = 0.01
+P95_INCREASE = 0.20
+P95_MIN_MS = 2.0
+
+# Strata below these many queries are too small to flag recall / p95 on
+MIN_RECALL_QUERIES = 20
+MIN_LATENCY_QUERIES = 100
+
+
+def get_connection():
+    conn = sqlite3.connect(RESULTS_DB)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS eval_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_at TEXT NOT NULL,
+        git_commit TEXT NOT NULL,
+        engine TEXT NOT NULL,
+        index_version TEXT NOT NULL,
+        k INTEGER NOT NULL,
+        sample TEXT NOT NULL
+    );
+    """)
+    # One row per noise type plus an "all" row per run
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS eval_results (
+        run_id INTEGER NOT NULL,
+        stratum TEXT NOT NULL,
+        queries INTEGER NOT NULL,
+        recall REAL NOT NULL,
+        p50_ms REAL NOT NULL,
+        p95_ms REAL NOT NULL,
+        p99_ms REAL NOT NULL,
+        PRIMARY KEY (run_id, stratum),
+        FOREIGN KEY (run_id) REFERENCES eval_runs(id)
+    );
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_eval_runs_key ON eval_runs (engine, git_commit, index_version)")
+    return conn
+
+
+def git_commit() -> str:
+    """Short HEAD commit, suffixed with -dirty when the working tree has changes."""
+    # Ask the checkout this module lives in, wherever the run was started from
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True, cwd=repo).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True, cwd=repo).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def stratified_sample(per_stratum: int = 100, seed: int = 0) -> Iterator[tuple]:
+    """
+    Up to per_stratum noisy variants of each noise type, chosen by a seeded hash of the
+    string, so nightly runs see the same queries until the seed or the variants change.
+    Streams the table once and keeps only the sample in memory.
+
+    Yields tuples: (noisy_string, make_name, model_name, year, noise_type)
+    """
+    heaps: Dict[str, List[Tuple[int, tuple]]] = defaultdict(list)
+    for row in iter_labeled_noisy_variants():
+        # Negated, so the heap root is the largest hash kept and gets replaced first
+        key = -zlib.crc32(f"{seed}:{row[0]}".encode())
+        heap = heaps[row[4] or "unknown"]
+        if len(heap) < per_stratum:
+            heapq.heappush(heap, (key, row))
+        elif key > heap[0][0]:
+            heapq.heapreplace(heap, (key, row))
+    for stratum in sorted(heaps):
+        for _, row in sorted(heaps[stratum], reverse=True):
+            yield row
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def record_run(engine: str, index_version: str, k: int, sample: str,
+               strata: Dict[str, Dict[str, float]]) -> int:
+    """
+    Store one run's per-stratum metrics ({stratum: {queries, recall, p50_ms, p95_ms, p99_ms}}).
+    Returns the run id.
+    """
+    conn = get_connection()
+    cur = conn.execute(
+        "INSERT INTO eval_runs (run_at, git_commit, engine, index_version, k, sample) VALUES (?, ?, ?, ?, ?, ?)",
+        (datetime.now(timezone.utc).isoformat(timespec="seconds"), git_commit(), engine, index_version, k, sample),
+    )
+    run_id = cur.lastrowid
+    conn.executemany(
+        "INSERT INTO eval_results (run_id, stratum, queries, recall, p50_ms, p95_ms, p99_ms) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(run_id, stratum, m["queries"], m["recall"], m["p50_ms"], m["p95_ms"], m["p99_ms"])
+         for stratum, m in strata.items()],
+    )
+    conn.commit()
+    conn.close()
+    return run_id
+
+
+# --- Engines: (search_fn(query, k) -> results, index_version() -> str) ---
+
+def _es_engine():
+    from es_module.elasticsearch_client import client, INDEX_NAME
+    from es_module.search import search
+
+    def version():
+        # The alias name says nothing; the concrete index (vehicles_v{n}) behind it does
+        if client.indices.exists_alias(name=INDEX_NAME):
+            return ",".join(sorted(client.indices.get_alias(name=INDEX_NAME)))
+        return INDEX_NAME
+    return (lambda query, k: search(query, top_k=k)), version
+
+
+def _fts_engine():
+    from database.fts import FTS_TABLE, search
+    from .db import get_connection as catalog_connection
+
+    def version():
+        conn = catalog_connection()
+        rows = conn.execute(f"SELECT count(*) FROM {FTS_TABLE}").fetchone()[0]
+        conn.close()
+        return f"{FTS_TABLE}@{rows}"
+    return (lambda query, k: search(query, top_k=k)), version
+
+
+def _qdrant_engine():
+    from data.embeddings.quadrant import client, COLLECTION
+    from data.embeddings.test_quadrant import search
+
+    def version():
+        return f"{COLLECTION}@{client.count(collection_name=COLLECTION).count}"
+    return (lambda query, k: search(query, k)), version
+
+
+def _qdrant_multi_engine():
+    from data.embeddings.quadrant import client, MULTI_COLLECTION
+    from data.embeddings.test_quadrant import search_multi
+
+    def version():
+        return f"{MULTI_COLLECTION}@{client.count(collection_name=MULTI_COLLECTION).count}"
+    return (lambda query, k: search_multi(query, k)), version
+
+
+ENGINES: Dict[str, Callable] = {"es": _es_engine, "fts": _fts_engine, "qdrant": _qdrant_engine,
+                                "qdrant_multi": _qdrant_multi_engine}
+
+
+def run_eval(engine: str = "es", k: int = 10, per_stratum: int = 100, seed: int = 0,
+             index_version: Optional[str] = None, warmup: int = 20) -> int:
+    """
+    Evaluate one engine on a stratified sample of noisy variants (recall@k and latency
+    per noise type) and persist the run keyed by git commit, engine and index version.
+
+    Args:
+        engine: "es", "fts", "qdrant" or "qdrant_multi"
+        k: Results per query
+        per_stratum: Queries sampled per noise type
+        seed: Sample seed; only runs with the same sample are compared
+        index_version: Override the detected index version
+        warmup: Untimed queries run first, so connection setup and cold caches don't skew p95
+
+    Returns:
+        The run id
+    """
+    from data.embeddings.evaluation_metrics import precision_recall
+    search_fn, version_fn = ENGINES[engine]()
+    index_version = index_version or version_fn()
+
+    sample = list(stratified_sample(per_stratum, seed))
+    for noisy_string, *_ in sample[:warmup]:
+        search_fn(noisy_string, k)
+
+    hits, latencies = defaultdict(list), defaultdict(list)
+    for noisy_string, make_name, model_name, year, noise_type in sample:
+        start = time.perf_counter()
+        results = search_fn(noisy_string, k)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        correct, _ = precision_recall(results, (make_name, model_name, year))
+        for stratum in (noise_type or "unknown", "all"):
+            hits[stratum].append(correct)
+            latencies[stratum].append(elapsed_ms)
+
+    strata = {
+        stratum: {
+            "queries": len(values),
+            "recall": round(sum(values) / len(values), 4),
+            "p50_ms": round(_percentile(latencies[stratum], 50), 2),
+            "p95_ms": round(_percentile(latencies[stratum], 95), 2),
+            "p99_ms": round(_percentile(latencies[stratum], 99), 2),
+        }
+        for stratum, values in hits.items()
+    }
+    run_id = record_run(engine, index_version, k, f"stratified:{per_stratum}:{seed}", strata)
+    overall = strata.get("all", {"queries": 0, "recall": 0.0, "p95_ms": 0.0})
+    print(f"🧾 Run {run_id}: {engine} @ {index_version} ({git_commit()}) "
+          f"Recall@{k} {overall['recall']:.4f}, p95 {overall['p95_ms']} ms on {overall['queries']} queries")
+    return run_id
+
+
+def _load_run(conn, run_id: int) -> Tuple[tuple, Dict[str, dict]]:
+    run = conn.execute("SELECT id, run_at, git_commit, engine, index_version, k, sample FROM eval_runs WHERE id = ?",
+                       (run_id,)).fetchone()
+    rows = conn.execute("SELECT stratum, queries, recall, p95_ms FROM eval_results WHERE run_id = ?", (run_id,))
+    return run, {stratum: {"queries": q, "recall": r, "p95_ms": p95} for stratum, q, r, p95 in rows}
+
+
+def compare_runs(baseline_id: int, candidate_id: int, recall_drop: float = RECALL_DROP,
+                 p95_increase: float = P95_INCREASE) -> List[dict]:
+    """
+    Per-stratum recall and p95 changes from a baseline run to a candidate run. Strata too
+    small for a stable recall (MIN_RECALL_QUERIES) or p95 (MIN_LATENCY_QUERIES) are shown
+    but never flagged. Returns the regressions (stratum, metric, baseline, candidate) beyond the thresholds.
+    """
+    conn = get_connection()
+    (base_run, base), (cand_run, cand) = _load_run(conn, baseline_id), _load_run(conn, candidate_id)
+    conn.close()
+
+    print(f"📈 {cand_run[3]}: run {baseline_id} ({base_run[2]}, {base_run[4]}) -> "
+          f"run {candidate_id} ({cand_run[2]}, {cand_run[4]})")
+    regressions = []
+    for stratum in sorted(set(base) & set(cand), key=lambda s: (s != "all", s)):
+        b, c = base[stratum], cand[stratum]
+        flags = []
+        queries = min(b["queries"], c["queries"])
+        if queries >= MIN_RECALL_QUERIES and b["recall"] - c["recall"] > recall_drop:
+            flags.append("recall")
+        if queries >= MIN_LATENCY_QUERIES and c["p95_ms"] - b["p95_ms"] > max(P95_MIN_MS, p95_increase * b["p95_ms"]):
+            flags.append("p95_ms")
+        for metric in flags:
+            regressions.append({"engine": cand_run[3], "stratum": stratum, "metric": metric,
+                                "baseline": b[metric], "candidate": c[metric],
+                                "baseline_run": baseline_id, "candidate_run": candidate_id})
+        mark = "⚠️ " if flags else "✅"
+        print(f"   {mark} {stratum:<12} recall {b['recall']:.4f} -> {c['recall']:.4f} "
+              f"({c['recall'] - b['recall']:+.4f})  p95 {b['p95_ms']:>7} -> {c['p95_ms']:>7} ms")
+    return regressions
+
+
+def report(engine: Optional[str] = None, recall_drop: float = RECALL_DROP,
+           p95_increase: float = P95_INCREASE) -> List[dict]:
+    """
+    Compare each engine's latest run with the previous run on the same sample and k,
+    print the per-stratum changes and return the regressions beyond the thresholds.
+    """
+    conn = get_connection()
+    query = "SELECT engine, k, sample, id FROM eval_runs"
+    params = []
+    if engine:
+        query += " WHERE engine = ?"
+        params.append(engine)
+    runs = defaultdict(list)
+    for run_engine, k, sample, run_id in conn.execute(query + " ORDER BY id", params):
+        runs[(run_engine, k, sample)].append(run_id)
+    conn.close()
+
+    regressions = []
+    for (run_engine, k, sample), ids in sorted(runs.items()):
+        if len(ids) < 2:
+            print(f"ℹ️  {run_engine} (k={k}, {sample}): only one run, nothing to compare")
+            continue
+        regressions.extend(compare_runs(ids[-2], ids[-1], recall_drop, p95_increase))
+
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond thresholds "
+              f"(recall -{recall_drop}, p95 +{p95_increase:.0%})")
+    else:
+        print("✅ No regressions")
+    return regressions
+
+
+if __name__ == "__main__":
+    # Nightly: python -m database.results [engine]; exits non-zero on a regression
+    sys.exit(1 if report(sys.argv[1] if len(sys.argv) > 1 else None) else 0)
@@ -0,0 +1,68 @@
+import gc
+import os
+import tracemalloc
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence
+
+# Working-memory ceiling for build / eval pipelines; chunk sizes are derived from it
+MEMORY_LIMIT_MB = int(os.environ.get("VEHICLE_MEMORY_LIMIT_MB", 256))
+
+# Rough in-flight footprint of one catalog row at each stage (Python objects, not the DB)
+ROW_BYTES = 200          # (make, model, year, make_id, model_id) tuple
+DOCUMENT_BYTES = 2000    # ES document dict + bulk action + serialized line
+POINT_BYTES = 4000       # payload dict + float32 vector (+ the embedder's own buffers)
+
+
+def chunk_rows(bytes_per_row: int, memory_mb: int = MEMORY_LIMIT_MB, minimum: int = 1) -> int:
+    """Rows per chunk so one chunk of a stage stays within memory_mb."""
+    return max(minimum, (memory_mb * 1024 * 1024) // bytes_per_row)
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Yield lists of up to `size` items without materializing the iterable."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def peak_memory_mb(fn: Callable, *args, **kwargs) -> float:
+    """Peak Python heap (tracemalloc) while running fn, in MB."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def synthetic_rows(n: int) -> Iterator[tuple]:
+    """n catalog-shaped rows (make_name, model_name, year, make_id, model_id), generated lazily."""
+    for i in range(n):
+        make_id = str(i % 10000)
+        yield f"MAKE {make_id}", f"MODEL {i}", 1981 + i % 45, make_id, str(i)
+
+
+def check_flat_memory(pipeline: Callable[[Iterable], object],
+                      sizes: Sequence[int] = (100_000, 1_000_000, 5_000_000),
+                      tolerance: float = 1.5) -> Dict[int, float]:
+    """
+    Run pipeline(rows) over synthetic catalogs of growing size and assert that its peak
+    memory does not grow with the catalog (largest peak <= tolerance * smallest peak).
+
+    Returns:
+        Dict of catalog size -> peak MB
+    """
+    peaks = {}
+    for n in sizes:
+        peaks[n] = round(peak_memory_mb(pipeline, synthetic_rows(n)), 2)
+        print(f"   {n:>10,} rows: peak {peaks[n]} MB")
+    smallest, largest = min(peaks.values()), max(peaks.values())
+    assert largest <= tolerance * max(smallest, 1.0), \
+        f"Peak memory grows with catalog size: {peaks}"
+    print(f"✅ Peak memory flat within {tolerance}x across {len(sizes)} catalog sizes")
+    return peaks
@@ -12,15 +12,29 @@ ELASTICSEARCH_PASSWORD = os.environ.get("ELASTICSEARCH_PASSWORD", None)
 ELASTICSEARCH_CLOUD_ID = os.environ.get("ELASTICSEARCH_CLOUD_ID", None)
 ELASTICSEARCH_API_KEY = os.environ.get("ELASTICSEARCH_API_KEY", None)
 
-# Index name
+# "cluster" talks to a real Elasticsearch; "fake" uses the in-process stand-in
+# (es_module/fake_backend.py) for offline tests and benchmarks
+ELASTICSEARCH_BACKEND = os.environ.get("ELASTICSEARCH_BACKEND", "cluster")
+
+# Index name (read alias; physical indices are versioned as "{INDEX_NAME}_v{n}")
 INDEX_NAME = os.environ.get("ELASTICSEARCH_INDEX_NAME", "vehicles")
 
+# Index layout
+NUMBER_OF_SHARDS = int(os.environ.get("ELASTICSEARCH_NUMBER_OF_SHARDS", 1))
+NUMBER_OF_REPLICAS = int(os.environ.get("ELASTICSEARCH_NUMBER_OF_REPLICAS", 0))
+# Optional custom routing ("year" or "make") so related documents share a shard
+ROUTING_FIELD = os.environ.get("ELASTICSEARCH_ROUTING_FIELD", None)
+
 # --- Connect to Elasticsearch ---
 def create_client():
     """
     Create and return an Elasticsearch client.
     Supports both local Docker setup and Elastic Cloud.
     """
+    if ELASTICSEARCH_BACKEND == "fake":
+        from es_module.fake_backend import FakeElasticsearch
+        return FakeElasticsearch()
+
     # Common connection parameters
     # Set API compatibility to version 8 to match Elasticsearch 8.11.0 server
     # Use headers parameter to force API version 8 compatibility
@@ -115,11 +129,13 @@ def get_index_info(index_name: str = INDEX_NAME):
         stats = client.indices.stats(index=index_name)
         mapping = client.indices.get_mapping(index=index_name)
         
+        # index_name may be an alias, so read totals across the indices it points to
         return {
             'exists': True,
-            'document_count': stats['indices'][index_name]['total']['docs']['count'],
-            'size': stats['indices'][index_name]['total']['store']['size_in_bytes'],
-            'mapping': mapping[index_name]['mappings']
+            'indices': list(mapping.keys()),
+            'document_count': stats['_all']['total']['docs']['count'],
+            'size': stats['_all']['total']['store']['size_in_bytes'],
+            'mapping': next(iter(mapping.values()))['mappings']
         }
     except Exception as e:
         print(f"❌ Error getting index info: {e}")
@@ -130,7 +146,11 @@ def get_index_info(index_name: str = INDEX_NAME):
 __all__ = [
     'client',
     'INDEX_NAME',
+    'NUMBER_OF_SHARDS',
+    'NUMBER_OF_REPLICAS',
+    'ROUTING_FIELD',
     'ELASTICSEARCH_HOST',
+    'ELASTICSEARCH_BACKEND',
     'test_connection',
     'check_index_exists',
     'get_index_info',
@@ -0,0 +1,426 @@
+import fnmatch
+import json
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import BadRequestError, NotFoundError
+from elasticsearch.serializer import JsonSerializer
+from matching.features import levenshtein
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [t for v in value for t in _tokens(v)]
+    return _TOKEN_RE.findall(str(value).lower())
+
+
+def _api_error(cls, status: int, error_type: str, reason: str):
+    """An error shaped like the one elasticsearch-py raises for the same server response."""
+    meta = ApiResponseMeta(status=status, http_version="1.1", headers=HttpHeaders(), duration=0.0,
+                           node=NodeConfig("http", "fake", 9200))
+    return cls(message=error_type, meta=meta, body={"error": {"type": error_type, "reason": reason},
+                                                    "status": status})
+
+
+def _max_edits(fuzziness, length: int) -> int:
+    """Edit distance allowed by a fuzziness setting ("AUTO", "AUTO:4,8" or a number)."""
+    if fuzziness is None:
+        return 0
+    fuzziness = str(fuzziness).upper()
+    if fuzziness.startswith("AUTO"):
+        low, high = (3, 6)
+        if ":" in fuzziness:
+            low, high = (int(x) for x in fuzziness.split(":")[1].split(","))
+        return 0 if length < low else 1 if length < high else 2
+    return int(fuzziness)
+
+
+class _Response(dict):
+    """Dict response that also exposes .body, like elastic_transport's ObjectApiResponse."""
+
+    @property
+    def body(self):
+        return self
+
+
+class _FakeIndex:
+    def __init__(self, settings: Optional[Dict] = None, mappings: Optional[Dict] = None):
+        self.settings = settings or {}
+        self.mappings = mappings or {}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        # field -> token -> doc ids (text fields), field -> value -> doc ids (exact lookups)
+        self.postings: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        self.exact: Dict[str, Dict[Any, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        # field -> first character -> vocabulary, so fuzzy/prefix lookups scan a small slice
+        self.vocabulary: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+
+    @staticmethod
+    def _indexed_fields(source: Dict[str, Any]):
+        for field, value in source.items():
+            items = value if isinstance(value, list) else [value]
+            # Objects (like collapsed "variants") are stored, not indexed
+            if not any(isinstance(item, dict) for item in items):
+                yield field, value, items
+
+    def put(self, doc_id: str, source: Dict[str, Any]):
+        # A replaced document must not stay findable under its old values
+        self.delete(doc_id)
+        self.docs[doc_id] = source
+        for field, value, items in self._indexed_fields(source):
+            for token in _tokens(value):
+                self.postings[field][token].add(doc_id)
+                self.vocabulary[field][token[0]].add(token)
+            for item in items:
+                self.exact[field][item].add(doc_id)
+
+    def delete(self, doc_id: str) -> bool:
+        source = self.docs.pop(doc_id, None)
+        if source is None:
+            return False
+        for field, value, items in self._indexed_fields(source):
+            for token in _tokens(value):
+                postings = self.postings[field].get(token)
+                if postings is not None:
+                    postings.discard(doc_id)
+                    if not postings:
+                        del self.postings[field][token]
+                        self.vocabulary[field][token[0]].discard(token)
+            for item in items:
+                ids = self.exact[field].get(item)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self.exact[field][item]
+        return True
+
+    def size_in_bytes(self) -> int:
+        return sum(len(json.dumps(doc)) for doc in self.docs.values())
+
+
+class FakeElasticsearch:
+    """
+    In-process stand-in for the part of the Elasticsearch client this repo uses
+    (index/alias management, bulk, search, count), so build -> search -> evaluate
+    runs without a cluster. Enabled with ELASTICSEARCH_BACKEND=fake.
+
+    Matching approximates the real mappings: text fields are lowercased word tokens,
+    a query token matches a token it is a prefix of (edge n-grams) or, with fuzziness,
+    one within the allowed edit distance of the token or its prefix. Scores are a sum of
+    boosted per-token match qualities, not BM25, so compare runs against each other,
+    not against a real cluster.
+    """
+
+    def __init__(self):
+        self._indices: Dict[str, _FakeIndex] = {}
+        self._aliases: Dict[str, Set[str]] = defaultdict(set)
+        self._synonym_sets: Dict[str, List[Dict]] = {}
+        self._client_meta = ()
+        self.indices = _IndicesClient(self)
+        self.cluster = _ClusterClient()
+        self.synonyms = _SynonymsClient(self)
+        self.transport = _Transport()
+
+    def options(self, **kwargs):
+        return self
+
+    def info(self, **kwargs):
+        return _Response(cluster_name="fake", version={"number": "8.11.0-fake"})
+
+    # --- name resolution ---
+    def _resolve(self, name: str, allow_missing: bool = True) -> List[str]:
+        names = []
+        for part in str(name).split(","):
+            if part in self._indices:
+                names.append(part)
+            elif self._aliases.get(part):
+                names.extend(sorted(self._aliases[part]))
+            elif any(c in part for c in "*?"):
+                names.extend(n for n in sorted(self._indices) if fnmatch.fnmatch(n, part))
+            elif not allow_missing:
+                raise _api_error(NotFoundError, 404, "index_not_found_exception", f"no such index [{part}]")
+        return names
+
+    def _write_index(self, name: str) -> _FakeIndex:
+        targets = self._resolve(name)
+        if len(targets) > 1:
+            raise _api_error(BadRequestError, 400, "illegal_argument_exception",
+                             f"no write index is defined for alias [{name}], which points to more than one index")
+        if not targets:
+            # Like ES with auto-create enabled
+            self._indices[name] = _FakeIndex()
+            targets = [name]
+        return self._indices[targets[0]]
+
+    # --- documents ---
+    def bulk(self, operations: Iterable, index: Optional[str] = None, **kwargs):
+        lines = [json.loads(op) if isinstance(op, (bytes, str)) else op for op in operations]
+        items = []
+        i = 0
+        while i < len(lines):
+            (op, meta), = lines[i].items()
+            i += 1
+            target = self._write_index(meta.get("_index", index))
+            doc_id = str(meta.get("_id"))
+            if op == "delete":
+                found = target.delete(doc_id)
+                items.append({op: {"_id": doc_id, "status": 200 if found else 404,
+                                   "result": "deleted" if found else "not_found"}})
+                continue
+            source = lines[i]
+            i += 1
+            if op == "update":
+                source = dict(target.docs.get(doc_id, {}), **source.get("doc", {}))
+            existed = doc_id in target.docs
+            target.put(doc_id, source)
+            items.append({op: {"_id": doc_id, "status": 200 if existed else 201,
+                               "result": "updated" if existed else "created"}})
+        # Like ES, a delete of a missing document is a 404 item but not an error
+        return _Response(took=0, errors=False, items=items)
+
+    def count(self, index: str, query: Optional[Dict] = None, **kwargs):
+        total = 0
+        for name in self._resolve(index):
+            idx = self._indices[name]
+            total += len(self._evaluate(idx, query)) if query else len(idx.docs)
+        return _Response(count=total)
+
+    def search(self, index: str, query: Optional[Dict] = None, size: int = 10, sort: Optional[list] = None,
+               search_after: Optional[list] = None, source=None, body: Optional[Dict] = None, **kwargs):
+        if body:
+            query, size = body.get("query", query), body.get("size", size)
+        hits = []
+        for name in self._resolve(index):
+            idx = self._indices[name]
+            for doc_id, score in self._evaluate(idx, query or {"match_all": {}}).items():
+                doc = idx.docs[doc_id]
+                year = doc.get("year") or 0
+                # A descending sort on a multi-valued field uses its largest value
+                hits.append((score, max(year) if isinstance(year, list) else year,
+                             doc.get("doc_id") or doc_id, name, doc_id))
+
+        # Score desc, year desc, doc_id asc: the sort search.py pages with
+        hits.sort(key=lambda h: (-h[0], -h[1], h[2]))
+        if search_after is not None:
+            after = (-search_after[0], -search_after[1], search_after[2])
+            hits = [h for h in hits if (-h[0], -h[1], h[2]) > after]
+
+        formatted = []
+        for score, year, tiebreak, name, doc_id in hits[:size]:
+            doc = self._indices[name].docs[doc_id]
+            hit = {"_index": name, "_id": doc_id, "_score": score,
+                   "_source": {k: doc.get(k) for k in source} if source else doc}
+            if sort:
+                hit["sort"] = [score, year, tiebreak]
+            formatted.append(hit)
+        return _Response(took=0, timed_out=False, hits={"hits": formatted})
+
+    # --- query evaluation ---
+    def _evaluate(self, idx: _FakeIndex, query: Dict) -> Dict[str, float]:
+        (kind, spec), = query.items()
+        if kind == "match_all":
+            return {doc_id: 1.0 for doc_id in idx.docs}
+        if kind == "term":
+            (field, value), = spec.items()
+            value = value["value"] if isinstance(value, dict) else value
+            field = field[:-len(".keyword")] if field.endswith(".keyword") else field
+            return {d: 1.0 for d in idx.exact[field].get(value, ()) if d in idx.docs}
+        if kind == "match":
+            return self._match(idx, spec)
+        if kind == "constant_score":
+            boost = spec.get("boost", 1.0)
+            return {d: boost for d in self._evaluate(idx, spec["filter"])}
+        if kind == "bool":
+            return self._bool(idx, spec)
+        raise _api_error(BadRequestError, 400, "parsing_exception", f"unknown query [{kind}]")
+
+    def _bool(self, idx: _FakeIndex, spec: Dict) -> Dict[str, float]:
+        def clauses(key):
+            value = spec.get(key, [])
+            return value if isinstance(value, list) else [value]
+
+        allowed: Optional[Set[str]] = None
+        for clause in clauses("filter"):
+            ids = set(self._evaluate(idx, clause))
+            allowed = ids if allowed is None else allowed & ids
+
+        scores: Optional[Dict[str, float]] = None
+        for clause in clauses("must"):
+            result = self._evaluate(idx, clause)
+            scores = result if scores is None else {d: scores[d] + s for d, s in result.items() if d in scores}
+
+        should = clauses("should")
+        minimum = spec.get("minimum_should_match", 0 if scores is not None or allowed is not None else 1)
+        matched: Dict[str, int] = defaultdict(int)
+        should_scores: Dict[str, float] = defaultdict(float)
+        for clause in should:
+            for d, s in self._evaluate(idx, clause).items():
+                matched[d] += 1
+                should_scores[d] += s
+
+        if scores is None:
+            if minimum:
+                scores = {d: 0.0 for d, n in matched.items() if n >= minimum}
+            else:
+                scores = {d: 0.0 for d in (allowed if allowed is not None else idx.docs)}
+        elif minimum:
+            scores = {d: s for d, s in scores.items() if matched[d] >= minimum}
+        for d in scores:
+            scores[d] += should_scores.get(d, 0.0)
+
+        if allowed is not None:
+            scores = {d: s for d, s in scores.items() if d in allowed}
+        for clause in clauses("must_not"):
+            excluded = self._evaluate(idx, clause)
+            scores = {d: s for d, s in scores.items() if d not in excluded}
+        return scores
+
+    def _match(self, idx: _FakeIndex, spec: Dict) -> Dict[str, float]:
+        (field, clause), = spec.items()
+        clause = clause if isinstance(clause, dict) else {"query": clause}
+        # Subfields (normalized_text.fuzzy) index the same text as their parent here
+        field = field.split(".")[0]
+        boost = clause.get("boost", 1.0)
+        fuzziness = clause.get("fuzziness")
+        prefix_length = clause.get("prefix_length", 0)
+        max_expansions = clause.get("max_expansions", 50)
+
+        scores: Dict[str, float] = defaultdict(float)
+        for token in _tokens(clause.get("query")):
+            weights = self._expand(idx, field, token, fuzziness, prefix_length, max_expansions)
+            best: Dict[str, float] = {}
+            for term, weight in weights.items():
+                for d in idx.postings[field][term]:
+                    if d in idx.docs and weight > best.get(d, 0.0):
+                        best[d] = weight
+            for d, weight in best.items():
+                scores[d] += boost * weight
+        return dict(scores)
+
+    @staticmethod
+    def _expand(idx: _FakeIndex, field: str, token: str, fuzziness, prefix_length: int,
+                max_expansions: int) -> Dict[str, float]:
+        """Index terms a query token matches, with a match quality in (0, 1]."""
+        edits = _max_edits(fuzziness, len(token))
+        weights = {}
+        fuzzy = []
+        for term in idx.vocabulary[field].get(token[0], ()):
+            if term == token:
+                weights[term] = 1.0
+            elif term.startswith(token):
+                weights[term] = 0.5 + 0.5 * len(token) / len(term)
+            elif edits and term[:prefix_length] == token[:prefix_length] \
+                    and len(term) >= len(token) - edits:
+                distance = min(levenshtein(token, term), levenshtein(token, term[:len(token)]))
+                if distance <= edits:
+                    fuzzy.append((distance, term))
+        for distance, term in sorted(fuzzy)[:max_expansions]:
+            weights.setdefault(term, 0.5 * (1 - distance / (len(token) + 1)))
+        return weights
+
+
+class _IndicesClient:
+    def __init__(self, es: FakeElasticsearch):
+        self.es = es
+
+    def exists(self, index: str, **kwargs) -> bool:
+        return bool(self.es._resolve(index))
+
+    def exists_alias(self, name: str, **kwargs) -> bool:
+        return bool(self.es._aliases.get(name))
+
+    def get_alias(self, name: str, **kwargs):
+        return _Response({index: {"aliases": {name: {}}} for index in sorted(self.es._aliases.get(name, ()))})
+
+    def get(self, index: str, allow_no_indices: bool = True, **kwargs):
+        names = self.es._resolve(index, allow_missing=allow_no_indices)
+        return _Response({n: {"settings": self.es._indices[n].settings,
+                              "mappings": self.es._indices[n].mappings} for n in names})
+
+    def create(self, index: str, settings: Optional[Dict] = None, mappings: Optional[Dict] = None,
+               body: Optional[Dict] = None, **kwargs):
+        if index in self.es._indices or self.es._aliases.get(index):
+            raise _api_error(BadRequestError, 400, "resource_already_exists_exception",
+                             f"index [{index}] already exists")
+        if body:
+            settings, mappings = body.get("settings"), body.get("mappings")
+        self.es._indices[index] = _FakeIndex(settings, mappings)
+        return _Response(acknowledged=True, index=index)
+
+    def delete(self, index: str, **kwargs):
+        for name in self.es._resolve(index, allow_missing=False):
+            del self.es._indices[name]
+            for targets in self.es._aliases.values():
+                targets.discard(name)
+        return _Response(acknowledged=True)
+
+    def update_aliases(self, actions: List[Dict], **kwargs):
+        for action in actions:
+            (kind, spec), = action.items()
+            if kind == "add":
+                self.es._aliases[spec["alias"]].add(spec["index"])
+            elif kind == "remove":
+                self.es._aliases[spec["alias"]].discard(spec["index"])
+            elif kind == "remove_index":
+                self.delete(spec["index"])
+        return _Response(acknowledged=True)
+
+    def put_settings(self, index: str, settings: Dict, **kwargs):
+        for name in self.es._resolve(index):
+            self.es._indices[name].settings.setdefault("index", {}).update(settings.get("index", settings))
+        return _Response(acknowledged=True)
+
+    def stats(self, index: str, **kwargs):
+        names = self.es._resolve(index)
+        per_index = {n: {"total": {"docs": {"count": len(self.es._indices[n].docs)},
+                                   "store": {"size_in_bytes": self.es._indices[n].size_in_bytes()}}}
+                     for n in names}
+        return _Response(_all={"total": {
+            "docs": {"count": sum(s["total"]["docs"]["count"] for s in per_index.values())},
+            "store": {"size_in_bytes": sum(s["total"]["store"]["size_in_bytes"] for s in per_index.values())},
+        }}, indices=per_index)
+
+    def get_mapping(self, index: str, **kwargs):
+        return _Response({n: {"mappings": self.es._indices[n].mappings} for n in self.es._resolve(index)})
+
+    def refresh(self, **kwargs):
+        return _Response(_shards={"failed": 0})
+
+    def forcemerge(self, **kwargs):
+        return _Response(_shards={"failed": 0})
+
+    def reload_search_analyzers(self, **kwargs):
+        return _Response(_shards={"failed": 0})
+
+
+class _ClusterClient:
+    def health(self, **kwargs):
+        return _Response(status="green", timed_out=False)
+
+
+class _SynonymsClient:
+    def __init__(self, es: FakeElasticsearch):
+        self.es = es
+
+    def put_synonym(self, id: str, synonyms_set: List[Dict], **kwargs):
+        self.es._synonym_sets[id] = synonyms_set
+        return _Response(result="created")
+
+    def get_synonym(self, id: str, from_: int = 0, size: int = 10, **kwargs):
+        if id not in self.es._synonym_sets:
+            raise _api_error(NotFoundError, 404, "resource_not_found_exception", f"synonyms set [{id}] not found")
+        rules = self.es._synonym_sets[id]
+        return _Response(count=len(rules), synonyms_set=rules[from_:from_ + size])
+
+
+class _Serializers:
+    def get_serializer(self, mimetype: str):
+        return JsonSerializer()
+
+
+class _Transport:
+    serializers = _Serializers()
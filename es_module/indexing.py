@@ -1,25 +1,55 @@
-import uuid
-from typing import List, Dict, Any
-from es_module.elasticsearch_client import client, INDEX_NAME, test_connection, check_index_exists
-from database.db import fetch_canonical_models
+import json
+import os
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+from es_module.elasticsearch_client import (
+    client, INDEX_NAME, NUMBER_OF_SHARDS, NUMBER_OF_REPLICAS, ROUTING_FIELD,
+    test_connection, check_index_exists
+)
+from database.db import iter_canonical_models, iter_model_families, get_changes, get_last_change_id, get_sync_state, set_sync_state
 from data.noisy_data.noise import MAKE_ABBR_MAP
+from data.noisy_data.abbreviations import build_alias_table, MAX_AMBIGUITY
+from database.streaming import MEMORY_LIMIT_MB, ROW_BYTES, DOCUMENT_BYTES, chunk_rows
+from matching.families import family_key
+from matching.normalize import document_text, make_aliases
 from tqdm import tqdm
-from elasticsearch.helpers import bulk
+from elasticsearch import ApiError, NotFoundError, ConnectionError as TransportConnectionError
+from data.uploader import (BulkUploader, AdaptiveBatchSize, RetryableError, BatchTooLargeError, Failure, MAX_IN_FLIGHT,
+                           RETRY_STATUSES, claim_dead_letters, read_dead_letters)
 
+# Search-time synonyms: "api" uses the synonyms API (ES >= 8.10),
+# "file" reads SYNONYMS_PATH relative to the ES config directory
+SYNONYMS_SOURCE = os.environ.get("ELASTICSEARCH_SYNONYMS_SOURCE", "api")
+SYNONYMS_SET = os.environ.get("ELASTICSEARCH_SYNONYMS_SET", "vehicle-make-synonyms")
+SYNONYMS_PATH = "analysis/make_synonyms.txt"
+# Rules one synonyms set may hold; larger rule lists are published as a file instead
+SYNONYMS_SET_MAX_RULES = 10_000
+# Host directory mounted into the container as config/analysis (see docker-compose.yml)
+SYNONYMS_LOCAL_DIR = os.environ.get("ELASTICSEARCH_SYNONYMS_DIR", "es_config/analysis")
 
-def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
+
+def create_index(index_name: str = INDEX_NAME, recreate: bool = False,
+                 number_of_shards: int = NUMBER_OF_SHARDS, number_of_replicas: int = NUMBER_OF_REPLICAS,
+                 routing_field: Optional[str] = ROUTING_FIELD, bulk_load: bool = False,
+                 collapse_years: bool = False):
     """
     Create Elasticsearch index with optimized mappings for vehicle search.
     
     Features:
     - Custom analyzers for fuzzy matching and typo tolerance
     - Edge n-grams for autocomplete
-    - Synonym support for make abbreviations
+    - Search-time synonym support for make abbreviations (reloadable, no reindex)
     - Proper field types for filtering (year, make, model)
     
     Args:
         index_name: Name of the index to create
         recreate: If True, delete existing index and create new one
+                  (searches fail while it is rebuilt; use rebuild_index() for zero downtime)
+        number_of_shards: Primary shard count
+        number_of_replicas: Replica count (applied after the bulk load when bulk_load=True)
+        routing_field: Require custom routing on this document field ("year" or "make")
+        bulk_load: Create without replicas and refreshes, for a fresh index that is filled before use
+        collapse_years: Mark the index as holding one document per (make, model) with a year set
     """
     # Test connection first
     test_connection()
@@ -34,11 +64,15 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
         print(f"ℹ️  Index '{index_name}' already exists. Use recreate=True to overwrite.")
         return
     
+    # The synonym_graph filter needs its synonyms set / file to exist first
+    synonyms_source = _synonyms_source(update_synonyms(reload=False))
+
     # Define index settings with custom analyzers
     index_settings = {
         "settings": {
-            "number_of_shards": 1,  # Single shard for small dataset
-            "number_of_replicas": 0,  # No replicas for local development
+            "number_of_shards": number_of_shards,
+            "number_of_replicas": 0 if bulk_load else number_of_replicas,
+            "refresh_interval": "-1" if bulk_load else "1s",
             "analysis": {
                 "analyzer": {
                     "vehicle_analyzer": {
@@ -47,8 +81,16 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
                         "filter": [
                             "lowercase",
                             "asciifolding",  # Handle accents
-                            "synonym_filter",  # For make abbreviations (must come before n-gram)
-                            "edge_ngram_filter"  # For partial matching (after synonyms)
+                            "edge_ngram_filter"  # For partial matching
+                        ]
+                    },
+                    "vehicle_search_analyzer": {
+                        "type": "custom",
+                        "tokenizer": "standard",
+                        "filter": [
+                            "lowercase",
+                            "asciifolding",
+                            "synonym_filter"  # Expands make abbreviations in the query only
                         ]
                     },
                     "fuzzy_analyzer": {
@@ -66,18 +108,18 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
                         "min_gram": 2,
                         "max_gram": 15
                     },
-                    "synonym_filter": {
-                        "type": "synonym",
-                        "synonyms": _build_synonym_list()
-                    }
+                    "synonym_filter": _synonym_filter_settings(synonyms_source)
                 }
             }
         },
         "mappings": {
+            "_routing": {"required": routing_field is not None},
+            "_meta": {"collapsed_years": collapse_years},
             "properties": {
                 "make": {
                     "type": "text",
                     "analyzer": "vehicle_analyzer",
+                    "search_analyzer": "vehicle_search_analyzer",
                     "fields": {
                         "keyword": {
                             "type": "keyword"  # For exact matching/filtering
@@ -87,6 +129,7 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
                 "model": {
                     "type": "text",
                     "analyzer": "vehicle_analyzer",
+                    "search_analyzer": "vehicle_search_analyzer",
                     "fields": {
                         "keyword": {
                             "type": "keyword"  # For exact matching/filtering
@@ -94,11 +137,12 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
                     }
                 },
                 "year": {
-                    "type": "integer"  # For range queries
+                    "type": "integer"  # For range queries (a year set in collapsed documents)
                 },
                 "normalized_text": {
                     "type": "text",
                     "analyzer": "vehicle_analyzer",
+                    "search_analyzer": "vehicle_search_analyzer",
                     "fields": {
                         "fuzzy": {
                             "type": "text",
@@ -115,6 +159,15 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
                 },
                 "model_id": {
                     "type": "keyword"
+                },
+                # Copy of _id (not sortable in 8.x): unique tiebreaker for search_after paging
+                "doc_id": {
+                    "type": "keyword"
+                },
+                # (year, model_id) pairs of a collapsed document, only read back on output
+                "variants": {
+                    "type": "object",
+                    "enabled": False
                 }
             }
         }
@@ -141,96 +194,294 @@ def create_index(index_name: str = INDEX_NAME, recreate: bool = False):
 
 def _build_synonym_list() -> List[str]:
     """
-    Build synonym list from MAKE_ABBR_MAP for Elasticsearch synonym filter.
-    Returns list of synonym pairs in Elasticsearch format: "make,abbreviation"
+    Build synonym rules from MAKE_ABBR_MAP for the search-time synonym_graph filter.
+    Returns one explicit rule per abbreviation: "abbreviation => abbreviation, make[, make...]"
+
+    Only the abbreviation is expanded (make names are not made equivalent to each other),
+    and abbreviations shared by more than MAX_AMBIGUITY makes are skipped.
     """
     synonyms = []
-    for make_name, abbr in MAKE_ABBR_MAP.items():
-        if abbr and abbr != make_name:
-            # Format: "full_name,abbreviation" (both ways)
-            synonyms.append(f"{make_name.lower()},{str(abbr).lower()}")
-            synonyms.append(f"{str(abbr).lower()},{make_name.lower()}")
+    for abbr, makes in build_alias_table(MAKE_ABBR_MAP).items():
+        if len(makes) > MAX_AMBIGUITY:
+            continue
+        targets = ", ".join(_escape_synonym(m) for m in [abbr] + makes)
+        synonyms.append(f"{_escape_synonym(abbr)} => {targets}")
     return synonyms
 
 
-def build_index(limit: int = 1000, offset: int = 0, index_name: str = INDEX_NAME, batch_size: int = 100):
+def _escape_synonym(term: str) -> str:
+    """Escape characters that have meaning in the Solr synonym format."""
+    return term.replace("\\", "\\\\").replace(",", "\\,").replace("=>", "=\\>")
+
+
+def _synonyms_source(rule_count: int) -> str:
+    """SYNONYMS_SOURCE, or "file" when the rules would not fit in one synonyms set."""
+    if SYNONYMS_SOURCE == "api" and rule_count > SYNONYMS_SET_MAX_RULES:
+        return "file"
+    return SYNONYMS_SOURCE
+
+
+def _synonym_filter_settings(source: str = SYNONYMS_SOURCE) -> Dict[str, Any]:
+    """
+    synonym_graph filter backed by the synonyms API or a synonyms file.
+    updateable=True lets the rules be reloaded without closing or reindexing the index.
+    """
+    settings = {"type": "synonym_graph", "updateable": True, "lenient": True}
+    if source == "file":
+        settings["synonyms_path"] = SYNONYMS_PATH
+    else:
+        settings["synonyms_set"] = SYNONYMS_SET
+    return settings
+
+
+def update_synonyms(index_name: str = INDEX_NAME, reload: bool = True) -> int:
+    """
+    Publish the make synonym rules without reindexing.
+
+    With the synonyms API, putting the set reloads every analyzer that uses it.
+    With a synonyms file, the file is rewritten and the index's search analyzers reloaded.
+    Rules that are already published are left alone, so nothing is reloaded, and more
+    rules than a synonyms set holds (SYNONYMS_SET_MAX_RULES) fall back to the file.
+
+    Args:
+        index_name: Index whose search analyzers should be reloaded (file mode)
+        reload: Set False when the index does not exist yet
+
+    Returns:
+        Number of synonym rules published
+    """
+    rules = _build_synonym_list()
+    source = _synonyms_source(len(rules))
+    if source != SYNONYMS_SOURCE:
+        print(f"⚠️  {len(rules)} synonym rules exceed the {SYNONYMS_SET_MAX_RULES} a synonyms set holds; "
+              f"writing {SYNONYMS_PATH} instead (it must be in every node's config directory)")
+
+    if source == "file":
+        os.makedirs(SYNONYMS_LOCAL_DIR, exist_ok=True)
+        path = os.path.join(SYNONYMS_LOCAL_DIR, os.path.basename(SYNONYMS_PATH))
+        content = "\n".join(rules) + "\n"
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                if f.read() == content:
+                    print(f"ℹ️  {len(rules)} make synonym rules unchanged ({source})")
+                    return len(rules)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if reload and check_index_exists(index_name):
+            client.indices.reload_search_analyzers(index=index_name)
+    else:
+        synonyms_set = [{"id": f"abbr-{i}", "synonyms": rule} for i, rule in enumerate(rules)]
+        if _published_synonyms() == {rule["id"]: rule["synonyms"] for rule in synonyms_set}:
+            print(f"ℹ️  {len(rules)} make synonym rules unchanged ({source})")
+            return len(rules)
+        client.synonyms.put_synonym(id=SYNONYMS_SET, synonyms_set=synonyms_set)
+
+    print(f"🔁 Published {len(rules)} make synonym rules ({source})")
+    return len(rules)
+
+
+def _published_synonyms() -> Optional[Dict[str, str]]:
+    """Rule id -> rule currently in the synonyms set, or None when the set does not exist."""
+    try:
+        response = client.synonyms.get_synonym(id=SYNONYMS_SET, size=SYNONYMS_SET_MAX_RULES)
+    except NotFoundError:
+        return None
+    return {rule["id"]: rule["synonyms"] for rule in response["synonyms_set"]}
+
+
+def document_id(model_id: str, year: int) -> str:
+    """Deterministic document id of a (model_id, year) catalog row."""
+    return f"{model_id}-{year}"
+
+
+def make_document(make_name: str, model_name: str, year: int, make_id: str = None, model_id: str = None) -> Dict[str, Any]:
+    """
+    Build the Elasticsearch document for one catalog row.
+    """
+    return {
+        "make": make_name,
+        "model": model_name,
+        "year": int(year),
+        "normalized_text": document_text(make_name, model_name, year),
+        "make_aliases": list(make_aliases(make_name)),
+        "make_id": make_id,
+        "model_id": model_id,
+        "doc_id": document_id(model_id, year),
+    }
+
+
+def family_document_id(make_id: str, model_name: str) -> str:
+    """Deterministic document id of a collapsed (make, model) document."""
+    return f"family-{family_key(make_id, model_name)}"
+
+
+def make_family_document(make_name: str, model_name: str, make_id: str,
+                         variants: List[tuple]) -> Dict[str, Any]:
+    """
+    Build one document for every year of a (make, model): the text carries no year,
+    "year" holds the year set (so year filters work unchanged) and "variants" maps
+    each year back to its model_id.
+    """
+    doc = make_document(make_name, model_name, variants[0][0], make_id)
+    doc.update(
+        year=[year for year, _ in variants],
+        normalized_text=document_text(make_name, model_name),
+        model_id=None,
+        doc_id=family_document_id(make_id, model_name),
+        variants=[{"year": year, "model_id": model_id} for year, model_id in variants],
+    )
+    return doc
+
+
+def iter_family_actions(families: Iterable[tuple], index_name: str = INDEX_NAME,
+                        routing_field: Optional[str] = ROUTING_FIELD) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily turn collapsed rows (make_name, model_name, make_id, variants) into bulk index actions.
+    """
+    for make_name, model_name, make_id, variants in families:
+        action = {
+            "_index": index_name,
+            "_id": family_document_id(make_id, model_name),
+            "_source": make_family_document(make_name, model_name, make_id, variants),
+        }
+        if routing_field:
+            action["_routing"] = make_name.lower()
+        yield action
+
+
+def _es_send(actions: List[Dict[str, Any]]) -> List[Failure]:
+    """Send helper-style actions as one bulk request; returns the per-item failures."""
+    operations = []
+    for action in actions:
+        op = action.get("_op_type", "index")
+        meta = {"_index": action["_index"], "_id": action["_id"]}
+        if "_routing" in action:
+            meta["routing"] = action["_routing"]
+        operations.append({op: meta})
+        if op != "delete":
+            operations.append(action["_source"])
+
+    try:
+        response = client.bulk(operations=operations)
+    except TransportConnectionError as e:  # Includes ConnectionTimeout
+        raise RetryableError(f"{type(e).__name__}: {e}")
+    except ApiError as e:
+        if e.meta.status in RETRY_STATUSES:
+            raise RetryableError(f"HTTP {e.meta.status}: {e}")
+        if e.meta.status == 413:
+            raise BatchTooLargeError(f"HTTP 413: {e}")
+        raise
+
+    failures = []
+    for action, item in zip(actions, response["items"]):
+        result = next(iter(item.values()))
+        status = result.get("status", 500)
+        # Deleting a document that was never indexed is not a failure
+        if 200 <= status < 300 or (status == 404 and action.get("_op_type") == "delete"):
+            continue
+        failures.append((action, status in RETRY_STATUSES, json.dumps(result.get("error", status))))
+    return failures
+
+
+def es_uploader(index_name: str = INDEX_NAME, max_items: int = 1000,
+                memory_mb: int = MEMORY_LIMIT_MB, max_in_flight: int = MAX_IN_FLIGHT) -> BulkUploader:
+    """
+    Bulk uploader for index actions with byte/latency-sized batches, bounded
+    in-flight requests, retries and a dead-letter file named after the index.
+    """
+    max_bytes = max(64 << 10, memory_mb * 1024 * 1024 // (4 * max_in_flight))
+    return BulkUploader(f"es-{index_name}", _es_send, max_items=max_items, max_in_flight=max_in_flight,
+                        batch_size=AdaptiveBatchSize(initial_bytes=min(1 << 20, max_bytes), max_bytes=max_bytes))
+
+
+def replay_dead_letters(index_name: str = INDEX_NAME, path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Re-send the actions recorded in an index's dead-letter file; whatever fails again
+    is written to a fresh file. A replay that was interrupted is resumed first.
+    """
+    uploader = es_uploader(index_name)
+    replay = claim_dead_letters(path or uploader.dead_letter_path)
+    if replay is None:
+        print(f"✅ No dead letters to replay for {index_name}")
+        return dict(uploader.stats)
+    stats = uploader.upload(read_dead_letters(replay))
+    # Items that failed again are already in the fresh dead-letter file
+    os.remove(replay)
+    client.indices.refresh(index=index_name)
+    print(f"🔁 Replayed {stats['sent']} documents into {index_name} ({stats['dead_lettered']} failed again)")
+    return stats
+
+
+def iter_actions(rows: Iterable[tuple], index_name: str = INDEX_NAME,
+                 routing_field: Optional[str] = ROUTING_FIELD) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily turn catalog rows (make_name, model_name, year, make_id, model_id) into bulk index actions.
+    """
+    for row in rows:
+        doc = make_document(*row)
+        action = {
+            "_index": index_name,
+            "_id": document_id(doc["model_id"], doc["year"]),  # Stable, so changes can update it
+            "_source": doc
+        }
+        if routing_field:
+            action["_routing"] = str(doc[routing_field]).lower()
+        yield action
+
+
+def build_index(limit: Optional[int] = 1000, offset: int = 0, index_name: str = INDEX_NAME, batch_size: int = 1000,
+                routing_field: Optional[str] = ROUTING_FIELD, memory_mb: int = MEMORY_LIMIT_MB,
+                collapse_years: bool = False):
     """
     Build and populate Elasticsearch index from SQLite database.
+
+    Rows are streamed from the catalog through document building into bulk requests,
+    so only the requests in flight are in memory regardless of catalog size. Rejected
+    (429) and timed-out requests are retried with backoff; documents that still fail
+    are written to a dead-letter file (see replay_dead_letters).
     
     Args:
-        limit: Maximum number of records to fetch
+        limit: Maximum number of records to fetch (None for the whole catalog)
         offset: Starting offset for fetching records
         index_name: Name of the Elasticsearch index
-        batch_size: Number of documents to index per batch
+        batch_size: Maximum documents per bulk request (requests are otherwise sized by bytes and latency)
+        routing_field: Document field used as the routing key, if the index requires routing
+        memory_mb: Working-memory ceiling; caps the batch size and the bytes in flight
+        collapse_years: Index one document per (make, model) with its year set instead of
+                        one per (model, year); limit/offset then count (make, model) rows
         
     Returns:
         Number of documents indexed
     """
+    if collapse_years and routing_field == "year":
+        raise ValueError("Collapsed documents span several years; route them by 'make' instead")
+
     # Ensure index exists
     if not check_index_exists(index_name):
         print(f"📝 Creating index: {index_name}")
-        create_index(index_name, recreate=False)
-    
-    # Fetch canonical data from SQLite
-    rows = fetch_canonical_models(limit=limit, offset=offset)
-    print(f"📊 Fetched {len(rows)} canonical models from offset {offset}")
+        create_index(index_name, recreate=False, collapse_years=collapse_years)
     
-    if not rows:
+    # Stream canonical data from SQLite (or the columnar export)
+    if collapse_years:
+        families = iter_model_families(limit=limit, offset=offset, chunk_size=chunk_rows(ROW_BYTES, memory_mb // 4))
+        actions = iter_family_actions(families, index_name, routing_field)
+    else:
+        rows = iter_canonical_models(limit=limit, offset=offset, with_ids=True,
+                                     chunk_size=chunk_rows(ROW_BYTES, memory_mb // 4))
+        actions = iter_actions(rows, index_name, routing_field)
+    uploader = es_uploader(index_name, max_items=min(batch_size, chunk_rows(DOCUMENT_BYTES, memory_mb // 2)),
+                           memory_mb=memory_mb)
+    print(f"📤 Indexing canonical models from offset {offset} "
+          f"(up to {uploader.max_items} documents / adaptive byte size per request)...")
+
+    stats = uploader.upload(tqdm(actions, desc="Indexing", unit="docs"))
+    indexed_count = stats["sent"]
+    print(f"   {stats['requests']} bulk requests, {stats['retries']} retries")
+
+    if not indexed_count and not stats["dead_lettered"]:
         print("⚠️  No data to index")
         return 0
     
-    # Prepare documents for indexing
-    documents = []
-    for (make_name, model_name, year) in rows:
-        # Normalize text (same as Qdrant)
-        text = f"{year} {make_name} {model_name}".strip().lower().replace("  ", " ") if model_name else f"{year} {make_name}".lower()
-        
-        # Get make abbreviation/aliases
-        abbr = MAKE_ABBR_MAP.get(make_name)
-        alias_set = {make_name.lower()}
-        if abbr:
-            alias_set.add(str(abbr).lower())
-        
-        # Create document
-        doc = {
-            "make": make_name,
-            "model": model_name,
-            "year": int(year),
-            "normalized_text": text,
-            "make_aliases": list(alias_set),
-            # Store IDs if available (for future reference)
-            "make_id": None,  # Could be fetched from DB if needed
-            "model_id": None,  # Could be fetched from DB if needed
-        }
-        documents.append(doc)
-    
-    # Index documents in batches
-    indexed_count = 0
-    print(f"📤 Indexing {len(documents)} documents in batches of {batch_size}...")
-    
-    for i in tqdm(range(0, len(documents), batch_size), desc="Indexing"):
-        batch = documents[i:i + batch_size]
-        
-        # Prepare bulk operations
-        actions = []
-        for doc in batch:
-            actions.append({
-                "_index": index_name,
-                "_id": uuid.uuid4().hex,  # Generate unique ID
-                "_source": doc
-            })
-        
-        # Bulk index
-        try:
-            success, failed = bulk(client, actions, raise_on_error=False)
-            indexed_count += success
-            
-            if failed:
-                print(f"⚠️  {len(failed)} documents failed to index in this batch")
-        except Exception as e:
-            print(f"❌ Error indexing batch {i//batch_size + 1}: {e}")
-            raise
-    
     # Refresh index to make documents searchable immediately
     client.indices.refresh(index=index_name)
     
@@ -238,6 +489,166 @@ def build_index(limit: int = 1000, offset: int = 0, index_name: str = INDEX_NAME
     return indexed_count
 
 
+def rebuild_index(alias: str = INDEX_NAME, limit: Optional[int] = 1000, offset: int = 0, batch_size: int = 1000,
+                  number_of_shards: int = NUMBER_OF_SHARDS, number_of_replicas: int = NUMBER_OF_REPLICAS,
+                  routing_field: Optional[str] = ROUTING_FIELD, force_merge: bool = True, keep_versions: int = 1,
+                  collapse_years: bool = False):
+    """
+    Zero-downtime rebuild: load a new versioned index, then atomically point the alias at it.
+
+    Searches keep hitting the previous version (through the alias) until the swap.
+    
+    Args:
+        alias: Read alias that searches use
+        limit: Maximum number of records to fetch (None for the whole catalog)
+        offset: Starting offset for fetching records
+        batch_size: Maximum documents per bulk request
+        number_of_shards: Primary shard count of the new index
+        number_of_replicas: Replica count, added after the bulk load
+        routing_field: Route documents by this field ("year" or "make")
+        force_merge: Merge down to one segment before going live (faster queries and cold starts)
+        keep_versions: Number of previous versions to keep for rollback
+        collapse_years: Build one document per (make, model) with a year set (see build_index)
+        
+    Returns:
+        Name of the new physical index
+    """
+    last_change_id = get_last_change_id()
+    new_index = f"{alias}_v{_next_version(alias)}"
+    print(f"🏗️  Building {new_index} behind alias '{alias}'")
+    create_index(new_index, number_of_shards=number_of_shards, number_of_replicas=number_of_replicas,
+                 routing_field=routing_field, bulk_load=True, collapse_years=collapse_years)
+    build_index(limit=limit, offset=offset, index_name=new_index, batch_size=batch_size,
+                routing_field=routing_field, collapse_years=collapse_years)
+
+    if force_merge:
+        print(f"🧱 Force-merging {new_index} to a single segment")
+        client.options(request_timeout=600).indices.forcemerge(index=new_index, max_num_segments=1)
+
+    # Restore normal refreshes and add replicas before taking traffic
+    client.indices.put_settings(
+        index=new_index,
+        settings={"index": {"refresh_interval": "1s", "number_of_replicas": number_of_replicas}}
+    )
+    client.cluster.health(index=new_index, wait_for_status="yellow", timeout="60s")
+
+    swap_alias(alias, new_index)
+    _delete_old_versions(alias, keep=keep_versions)
+    # The new version already contains every change logged before the build started
+    set_sync_state(_sync_consumer(alias), last_change_id)
+    return new_index
+
+
+def swap_alias(alias: str, new_index: str):
+    """
+    Atomically move the alias to new_index in a single update_aliases call.
+    A legacy concrete index named like the alias is removed in the same call.
+    """
+    actions = [{"remove": {"index": index, "alias": alias}} for index in _alias_targets(alias)]
+    if _is_concrete_index(alias):
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": new_index, "alias": alias}})
+
+    client.indices.update_aliases(actions=actions)
+    print(f"🔀 Alias '{alias}' now points to {new_index}")
+
+
+def _alias_targets(alias: str) -> List[str]:
+    """Indices the alias currently points to."""
+    if not client.indices.exists_alias(name=alias):
+        return []
+    return list(client.indices.get_alias(name=alias).keys())
+
+
+def _is_concrete_index(name: str) -> bool:
+    return check_index_exists(name) and not client.indices.exists_alias(name=name)
+
+
+def _versions(alias: str) -> List[int]:
+    """Existing version numbers of "{alias}_v{n}" indices, ascending."""
+    pattern = re.compile(rf"^{re.escape(alias)}_v(\d+)$")
+    indices = client.indices.get(index=f"{alias}_v*", allow_no_indices=True)
+    return sorted(int(m.group(1)) for m in (pattern.match(name) for name in indices) if m)
+
+
+def _next_version(alias: str) -> int:
+    versions = _versions(alias)
+    return versions[-1] + 1 if versions else 1
+
+
+def _delete_old_versions(alias: str, keep: int = 1):
+    """Delete versions that are neither live nor among the `keep` most recent previous ones."""
+    live = set(_alias_targets(alias))
+    previous = [f"{alias}_v{v}" for v in _versions(alias) if f"{alias}_v{v}" not in live]
+    stale = previous[:-keep] if keep else previous
+    for index in stale:
+        print(f"🗑️  Deleting old index version: {index}")
+        client.indices.delete(index=index)
+
+
+def is_collapsed(index_name: str = INDEX_NAME) -> bool:
+    """Whether the index (or every index behind the alias) was built with collapse_years=True."""
+    if not check_index_exists(index_name):
+        return False
+    mappings = client.indices.get_mapping(index=index_name)
+    return all(m["mappings"].get("_meta", {}).get("collapsed_years", False) for m in mappings.values())
+
+
+def _sync_consumer(index_name: str) -> str:
+    return f"es:{index_name}"
+
+
+def apply_changes(index_name: str = INDEX_NAME, routing_field: Optional[str] = ROUTING_FIELD,
+                  batch_size: int = 1000) -> int:
+    """
+    Apply change_log entries written by data.nhtsa_refresh.refresh_nhtsa since this index
+    last synced: re-index inserted/updated rows and delete removed ones by their stable ids.
+    
+    Args:
+        index_name: Index or alias to update
+        routing_field: Routing field the index was built with
+        batch_size: Number of changes applied per bulk request
+        
+    Returns:
+        Number of changes applied
+    """
+    if is_collapsed(index_name):
+        print(f"⚠️  {index_name} holds collapsed (make, model) documents; "
+              f"refresh it with rebuild_index(collapse_years=True) instead")
+        return 0
+
+    consumer = _sync_consumer(index_name)
+    last_id = get_sync_state(consumer)
+    uploader = es_uploader(index_name, max_items=batch_size)
+    applied = 0
+
+    while True:
+        changes = get_changes(since_id=last_id, limit=batch_size)
+        if not changes:
+            break
+
+        actions = []
+        for change_id, op, make_id, model_id, year, make_name, model_name in changes:
+            action = {"_index": index_name, "_id": document_id(model_id, year)}
+            if op == "delete" or model_name is None:
+                action["_op_type"] = "delete"
+            else:
+                action["_source"] = make_document(make_name, model_name, year, make_id, model_id)
+            if routing_field:
+                action["_routing"] = str({"make": make_name, "year": year}[routing_field]).lower()
+            actions.append(action)
+
+        # Changes that still fail after retries land in the dead-letter file for replay_dead_letters()
+        uploader.upload(actions)
+        applied += len(actions)
+        last_id = changes[-1][0]
+        set_sync_state(consumer, last_id)
+
+    client.indices.refresh(index=index_name)
+    print(f"✅ Applied {applied - uploader.stats['dead_lettered']} catalog changes to {index_name}")
+    return applied
+
+
 def get_index_stats(index_name: str = INDEX_NAME):
     """
     Get statistics about the index.
@@ -252,13 +663,15 @@ def get_index_stats(index_name: str = INDEX_NAME):
         if not check_index_exists(index_name):
             return None
         
+        # index_name may be an alias, so read totals across the indices it points to
         stats = client.indices.stats(index=index_name)
         count_result = client.count(index=index_name)
+        size_bytes = stats["_all"]["total"]["store"]["size_in_bytes"]
         
         return {
             "document_count": count_result["count"],
-            "size_bytes": stats["indices"][index_name]["total"]["store"]["size_in_bytes"],
-            "size_mb": round(stats["indices"][index_name]["total"]["store"]["size_in_bytes"] / 1024 / 1024, 2)
+            "size_bytes": size_bytes,
+            "size_mb": round(size_bytes / 1024 / 1024, 2)
         }
     except Exception as e:
         print(f"❌ Error getting index stats: {e}")
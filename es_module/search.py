@@ -0,0 +1,153 @@
+from typing import List, Dict, Any, Optional
+from es_module.elasticsearch_client import client, INDEX_NAME, ROUTING_FIELD
+from es_module.indexing import document_id
+from matching.families import expand_families
+from matching.normalize import parse_query
+
+# Long vendor strings are cut to this many tokens before building fuzzy clauses
+MAX_QUERY_TOKENS = 8
+
+# Per-field fuzzy cost controls. The text fields are edge n-grammed (2-15), so an
+# unbounded fuzzy term can expand to thousands of n-gram terms; prefix_length pins
+# the first characters and max_expansions caps the number of candidate terms.
+FUZZY_FIELDS = {
+    "make": {"boost": 3.0, "fuzziness": "AUTO:4,8", "prefix_length": 1, "max_expansions": 20},
+    "model": {"boost": 2.0, "fuzziness": "AUTO:4,8", "prefix_length": 1, "max_expansions": 20},
+    "normalized_text.fuzzy": {"boost": 1.0, "fuzziness": "AUTO", "prefix_length": 2, "max_expansions": 10},
+    "make_aliases": {"boost": 2.0},  # Aliases are matched exactly, never fuzzily
+}
+
+# Fuzzy-stage order; doc_id (a keyword copy of _id) makes it total, so pages neither
+# repeat nor skip hits that tie on score and year
+SORT = [{"_score": "desc"}, {"year": "desc"}, {"doc_id": "asc"}]
+
+# Server-side time budget per request; slow shards return partial results instead of stalling
+DEFAULT_TIMEOUT = "200ms"
+
+
+def build_exact_query(year: Optional[int], tokens: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    Cheap first stage: keyword term lookups for every make/model split of the tokens
+    (in both orders, to catch reordered strings). Catalog names are stored uppercased.
+    Returns None when there is nothing to split.
+    """
+    if len(tokens) < 2:
+        return None
+
+    should = []
+    for i in range(1, len(tokens)):
+        left, right = " ".join(tokens[:i]).upper(), " ".join(tokens[i:]).upper()
+        for make, model in ((left, right), (right, left)):
+            should.append({"bool": {"filter": [
+                {"term": {"make.keyword": make}},
+                {"term": {"model.keyword": model}},
+            ]}})
+
+    query = {"bool": {"should": should, "minimum_should_match": 1}}
+    if year is not None:
+        query["bool"]["filter"] = [{"term": {"year": year}}]
+    return {"constant_score": {"filter": query}}
+
+
+def build_fuzzy_query(year: Optional[int], tokens: List[str], use_fuzzy: bool = True) -> Dict[str, Any]:
+    """
+    Second stage: per-field match clauses with bounded fuzzy expansion and a year filter.
+    """
+    text = " ".join(tokens)
+    should = []
+    for field, params in FUZZY_FIELDS.items():
+        clause = {"query": text, "boost": params["boost"]}
+        if use_fuzzy and "fuzziness" in params:
+            clause.update(
+                fuzziness=params["fuzziness"],
+                prefix_length=params["prefix_length"],
+                max_expansions=params["max_expansions"],
+                fuzzy_transpositions=True,
+            )
+        should.append({"match": {field: clause}})
+
+    query = {"bool": {"should": should, "minimum_should_match": 1}}
+    if year is not None:
+        query["bool"]["filter"] = [{"term": {"year": year}}]
+    return query
+
+
+def _format_hits(response, stage: str, year: Optional[int], top_k: int) -> List[Dict[str, Any]]:
+    hits = [
+        {
+            "score": round(hit["_score"] or 0.0, 4),
+            "id": hit["_id"],
+            "make": hit["_source"].get("make"),
+            "model": hit["_source"].get("model"),
+            "year": hit["_source"].get("year"),
+            "stage": stage,
+            "sort": hit.get("sort"),
+            "variants": hit["_source"].get("variants"),
+        }
+        for hit in response["hits"]["hits"]
+    ]
+    # Collapsed (make, model) documents expand back to one result per (model_id, year)
+    return expand_families(hits, year, top_k, document_id)
+
+
+def search(query: str, top_k: int = 10, use_fuzzy: bool = True, index_name: str = INDEX_NAME,
+           search_after: Optional[list] = None, terminate_after: Optional[int] = None,
+           timeout: str = DEFAULT_TIMEOUT, exact_first: bool = True) -> List[Dict[str, Any]]:
+    """
+    Search vehicles with a cost-bounded query plan.
+
+    Args:
+        query: Raw vendor string, e.g. "2015 fabrication llc"
+        top_k: Number of results to return
+        use_fuzzy: Enable bounded fuzzy matching in the second stage
+        index_name: Index (or alias) to search
+        search_after: Sort values of the last hit from a previous page (fuzzy-stage hits carry
+            them; exact-stage hits don't, so page with exact_first=False)
+        terminate_after: Optional per-shard cap on collected documents for the fuzzy stage
+        timeout: Server-side time budget for each request
+        exact_first: Try the keyword term stage before the fuzzy stage
+
+    Returns:
+        List of result dicts (score, id, make, model, year, stage, sort)
+    """
+    parsed = parse_query(query)
+    year, tokens = parsed.year, list(parsed.tokens[:MAX_QUERY_TOKENS])
+    source = ["make", "model", "year", "variants"]
+    # With year routing, a query that names a year only needs to hit one shard
+    routing = str(year) if ROUTING_FIELD == "year" and year is not None else None
+
+    # Stage 1: exact keyword lookup; any hit is as good as another, so stop early
+    exact_query = build_exact_query(year, tokens) if exact_first and search_after is None else None
+    if exact_query is not None:
+        response = client.search(
+            index=index_name,
+            query=exact_query,
+            size=top_k,
+            track_total_hits=False,
+            terminate_after=top_k,
+            timeout=timeout,
+            source=source,
+            routing=routing,
+        )
+        hits = _format_hits(response, "exact", year, top_k)
+        if hits:
+            return hits
+
+    # Stage 2: bounded fuzzy match
+    params = {"sort": SORT}
+    if search_after is not None:
+        params["search_after"] = search_after
+    if terminate_after:
+        params["terminate_after"] = terminate_after
+
+    response = client.search(
+        index=index_name,
+        query=build_fuzzy_query(year, tokens, use_fuzzy=use_fuzzy),
+        size=top_k,
+        track_total_hits=False,
+        timeout=timeout,
+        source=source,
+        routing=routing,
+        **params
+    )
+    return _format_hits(response, "fuzzy" if use_fuzzy else "match", year, top_k)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test file for Elasticsearch search functionality
+"""
+
+import json
+import time
+from collections import defaultdict
+from es_module.elasticsearch_client import client, INDEX_NAME
+from es_module.search import search as es_search
+from es_module.indexing import iter_actions, get_index_stats
+from database.streaming import batched, check_flat_memory
+from database.db import iter_labeled_noisy_variants
+from data.embeddings.evaluation_metrics import precision_recall
+
+# Latency budget the benchmark checks p99 against
+P99_BUDGET_MS = 250
+
+
+def view_index(index_name: str = INDEX_NAME, limit: int = 10):
+    """
+    View sample documents from the index.
+    """
+    try:
+        response = client.search(index=index_name, query={"match_all": {}}, size=limit, track_total_hits=False)
+        print(f"🔍 Sample documents from '{index_name}' (first {limit}):")
+        for i, hit in enumerate(response["hits"]["hits"], 1):
+            doc = hit["_source"]
+            print(f"   {i}. {doc.get('year')} {doc.get('make')} {doc.get('model')}")
+            print(f"      Text: {doc.get('normalized_text')}")
+    except Exception as e:
+        print(f"❌ Error viewing index: {e}")
+
+
+def es_demo_search(queries: list = None, use_fuzzy: bool = True):
+    """
+    Demo search functionality with sample queries.
+    """
+    if queries is None:
+        queries = ["2015 fabrication llc"]
+
+    print("🔍 Testing Elasticsearch search functionality")
+    print("=" * 50)
+
+    for query in queries:
+        print(f"\n🔍 Searching for: '{query}'")
+        results = es_search(query, top_k=3, use_fuzzy=use_fuzzy)
+        for i, result in enumerate(results, 1):
+            print(f"   {i}. {result['year']} {result['make']} {result['model']} "
+                  f"(score: {result['score']}, stage: {result['stage']})")
+
+
+def evaluate(limit=30, k=10, use_fuzzy=True, index_name=INDEX_NAME):
+    """
+    Precision/recall of the ES search over the noisy variants.
+    """
+    total_correct = 0
+    total_queries = 0
+
+    for noisy_string, make_name, model_name, year, _ in iter_labeled_noisy_variants(limit=limit):
+        results = es_search(noisy_string, top_k=k, use_fuzzy=use_fuzzy, index_name=index_name)
+        correct, _ = precision_recall(results, (make_name, model_name, year))
+        total_correct += correct
+        total_queries += 1
+
+    return {
+        "Precision": total_correct / total_queries,
+        "Recall": total_correct / total_queries,
+    }
+
+
+def compare_fuzzy_vs_exact(limit=30, k=10):
+    """
+    Compare search quality with and without fuzzy matching.
+    """
+    fuzzy = evaluate(limit=limit, k=k, use_fuzzy=True)
+    exact = evaluate(limit=limit, k=k, use_fuzzy=False)
+    print(f"📊 Recall@{k} on {limit} noisy variants")
+    print(f"   Fuzzy: {fuzzy['Recall']:.4f}")
+    print(f"   Exact: {exact['Recall']:.4f}")
+    return {"fuzzy": fuzzy, "exact": exact}
+
+
+def compare_collapsed(collapsed_index="vehicles_collapsed", baseline_index=INDEX_NAME, limit=300, k=10):
+    """
+    Index size and recall of a collapsed (make, model) index against the per-year baseline.
+    Build the collapsed one first: rebuild_index(alias=collapsed_index, collapse_years=True).
+    """
+    report = {}
+    for name in (baseline_index, collapsed_index):
+        stats = get_index_stats(name) or {"document_count": 0, "size_bytes": 0}
+        report[name] = dict(stats, recall=evaluate(limit=limit, k=k, index_name=name)["Recall"])
+
+    base, collapsed = report[baseline_index], report[collapsed_index]
+    print(f"📊 Collapsed vs per-year documents (Recall@{k} on {limit} noisy variants)")
+    for name, row in report.items():
+        print(f"   {name}: {row['document_count']} docs, {row['size_bytes'] / 1024 / 1024:.2f} MB, "
+              f"recall {row['recall']:.4f}")
+    if collapsed["document_count"]:
+        print(f"   Documents: {base['document_count'] / collapsed['document_count']:.1f}x fewer, "
+              f"recall change {collapsed['recall'] - base['recall']:+.4f}")
+    return report
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def benchmark_latency(limit=500, k=10, use_fuzzy=True, warmup=20):
+    """
+    Measure client-side search latency per noise type and check p99 against P99_BUDGET_MS.
+
+    Returns:
+        Dict of noise_type -> {count, p50_ms, p95_ms, p99_ms, within_budget}
+    """
+    for noisy_string, *_ in iter_labeled_noisy_variants(limit=min(warmup, limit)):
+        es_search(noisy_string, top_k=k, use_fuzzy=use_fuzzy)
+
+    latencies = defaultdict(list)
+    for noisy_string, _, _, _, noise_type in iter_labeled_noisy_variants(limit=limit):
+        start = time.perf_counter()
+        es_search(noisy_string, top_k=k, use_fuzzy=use_fuzzy)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        latencies[noise_type or "unknown"].append(elapsed_ms)
+        latencies["all"].append(elapsed_ms)
+
+    report = {}
+    print(f"⏱️  Search latency (k={k}, fuzzy={use_fuzzy}, budget p99 <= {P99_BUDGET_MS} ms)")
+    for noise_type, values in sorted(latencies.items()):
+        p99 = _percentile(values, 99)
+        report[noise_type] = {
+            "count": len(values),
+            "p50_ms": round(_percentile(values, 50), 2),
+            "p95_ms": round(_percentile(values, 95), 2),
+            "p99_ms": round(p99, 2),
+            "within_budget": p99 <= P99_BUDGET_MS,
+        }
+        flag = "✅" if p99 <= P99_BUDGET_MS else "⚠️ "
+        print(f"   {flag} {noise_type:<12} n={len(values):<5} "
+              f"p50={report[noise_type]['p50_ms']:>7} p95={report[noise_type]['p95_ms']:>7} "
+              f"p99={report[noise_type]['p99_ms']:>7} ms")
+    return report
+
+
+def benchmark_memory(sizes=(100_000, 1_000_000, 5_000_000), batch_size=500):
+    """
+    Check that the indexing pipeline (rows -> documents -> serialized bulk chunks) keeps a flat
+    peak memory as the catalog grows. Runs on synthetic rows with the bulk request replaced by
+    serialization only, so no cluster is needed; tracemalloc measures the Python heap.
+    """
+    def pipeline(rows):
+        for batch in batched(iter_actions(rows, INDEX_NAME, "year"), batch_size):
+            "\n".join(json.dumps(action) for action in batch)
+
+    print(f"🧠 Peak memory of the indexing pipeline (bulk chunks of {batch_size})")
+    return check_flat_memory(pipeline, sizes)
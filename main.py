@@ -1,18 +1,36 @@
 from data.nhtsa_data import nhtsa_combine_makes_and_models
+from data.merge import build_catalog
+from data.nhtsa_refresh import refresh_nhtsa
 from database.db import init_db
 from database.load_csv import load_csv
+from database.columnar import export_tables, import_tables
+from database.fts import build_fts_index, benchmark as benchmark_fts
+from database.results import run_eval, report
 from data.noisy_data.load_noise import load_noise
-from data.embeddings.quadrant import build_embeddings
+from data.embeddings.quadrant import build_embeddings, apply_changes as apply_embedding_changes, \
+    replay_dead_letters as replay_embedding_dead_letters
 from data.embeddings.test_quadrant import *
 from es_module.elasticsearch_client import *
-from es_module.indexing import create_index, build_index, get_index_stats
+from es_module.indexing import create_index, build_index, rebuild_index, apply_changes, get_index_stats, \
+    replay_dead_letters
 from es_module.test_elasticsearch import *
+from matching.rerank import train_reranker, evaluate_reranker
+from matching.router import default_router, fit_default_calibrators
+from matching.batch import match_batch, benchmark_scaling
+from matching.normalize import benchmark as benchmark_normalization
+from database.db import get_labeled_noisy_variants
 
 
 if __name__ == "__main__":
+    # Offline runs: ELASTICSEARCH_BACKEND=fake and QDRANT_PATH=:memory: (or an on-disk path)
+    # swap both engines for local stand-ins, so the steps below run without any server
+
     # "Get dataset from NHTSA"
     # nhtsa_combine_makes_and_models()
 
+    # "Get NHTSA + EPA and merge them into make_model_year.csv" (offline=True replays http_cache/)
+    # build_catalog()
+
     # "Insert dataset into db"
     # print("Initializing database...")
     # init_db(reset=True)
@@ -22,13 +40,36 @@ if __name__ == "__main__":
 
     # print("Done! Data inserted into vehicle.db")
 
+    # "Delta refresh": re-fetch new makes, current/next years and stale entries,
+    # then push only the logged changes to the indices
+    # refresh_nhtsa()
+    # apply_changes()  # Elasticsearch
+    # apply_embedding_changes()  # Qdrant
+
     # "Generate noisy variants"
     # print("Generating noisy variants...")
     # load_noise()
 
+    # Columnar export (Parquet + memory-mappable Arrow IPC);
+    # then set VEHICLE_CATALOG_SOURCE=columnar to read the catalog from it
+    # export_tables()
+
+    # Local matcher without Elasticsearch: SQLite FTS5 (trigram) prefilter + edit-distance rerank
+    # build_fts_index()
+    # benchmark_fts(limit=2000, k=10)
+
+    # Batch matching on one worker process per core (shared read-only index, results in input order)
+    # results = match_batch(queries, top_k=10, matcher="fts")  # or matcher="vector" with embeddings_path
+    # benchmark_scaling(limit=5000, worker_counts=(1, 2, 4, 8, 16, 32))
+
     # Build embeddings
     # uploaded = build_embeddings(limit=1000, offset=0)
     # print(f"Uploaded {uploaded} points to Qdrant")
+
+    # Named make / model / text vectors + sparse BM25, one prefetch + RRF request per query;
+    # compare recall@k against the single-vector collection built from the same slice
+    # build_embeddings(limit=1000, collection_name="vehicles_multi", multi_vector=True)
+    # compare_multi_vector("vehicles_multi", ks=(1, 3, 5, 10))
     
     # Run test file
     # view_collection(limit=5)
@@ -43,13 +84,19 @@ if __name__ == "__main__":
     # test_connection()
     
     # Index data into Elasticsearch
-    # print("Creating Elasticsearch index...")
-    # create_index(recreate=True)  # Set recreate=True to delete and recreate
-    
-    # print("Indexing vehicle data...")
-    # indexed = build_index(limit=1000, offset=0)
-    # print(f"Indexed {indexed} documents")
+    # Builds vehicles_v{n}, force-merges it and swaps the "vehicles" alias (no downtime)
+    # print("Rebuilding Elasticsearch index...")
+    # new_index = rebuild_index(limit=1000, offset=0)  # limit=None streams the whole catalog
+    # print(f"Alias now points to {new_index}")
+    # Documents / points that failed after retries land in dead_letters/; re-send them with
+    # replay_dead_letters(new_index)  or  replay_embedding_dead_letters("vehicles_semantic")
     
+    # Collapsed variant: one document per (make, model) with its year set, expanded back to
+    # (model_id, year) on output; compare size and recall against the per-year index
+    # rebuild_index(alias="vehicles_collapsed", limit=None, collapse_years=True)
+    # compare_collapsed("vehicles_collapsed")
+    # build_embeddings(limit=None, collection_name="vehicles_semantic_collapsed", collapse_years=True)
+
     # Index statistics:
     # stats = get_index_stats()
     # if stats:
@@ -60,7 +107,6 @@ if __name__ == "__main__":
     print("\n=== Testing Elasticsearch Search ===")
     # view_index(limit=50)  # View sample documents
     es_demo_search(use_fuzzy=True)  # Demo search with fuzzy matching
-    # test_fuzzy_matching()  # Test fuzzy matching capabilities
     
     # Evaluate search quality
     # metrics = evaluate(limit=30, k=10, use_fuzzy=True)
@@ -70,5 +116,32 @@ if __name__ == "__main__":
     
     # Compare fuzzy vs exact matching
     # compare_fuzzy_vs_exact(limit=30, k=10)
+
+    # Latency per noise type (p50/p95/p99)
+    # benchmark_latency(limit=500, k=10, use_fuzzy=True)
+
+    # Nightly drift check: evaluate on a stratified sample (per noise type), store the run in
+    # results.db keyed by commit / engine / index version, and flag recall or p95 regressions
+    # (same as: python -m database.results)
+    # run_eval("es", per_stratum=100)
+    # report()
+
+    # Throughput of the shared normalization / query parsing (strings per minute)
+    # benchmark_normalization(n_strings=1_000_000)
+
+    # Peak memory of the streaming indexing pipeline, 100k -> 5M synthetic rows
+    # (ceiling set with VEHICLE_MEMORY_LIMIT_MB)
+    # benchmark_memory()
+    
+    # Re-rank fused ES + Qdrant candidates (train offline on noisy_variants first)
+    # reranker = train_reranker(limit=2000)
+    # evaluate_reranker(reranker, limit=500, offset=2000)
+    
+    # Confidence routing: accept confident ES hits, escalate the rest, abstain when unsure
+    # fit_default_calibrators(limit=2000)
+    # router = default_router()
+    # for row in get_labeled_noisy_variants(limit=200, offset=2000):
+    #     router.route(row[0])
+    # router.report()
     
     pass  # Placeholder - uncomment tests above to run
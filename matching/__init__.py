@@ -0,0 +1 @@
+# Candidate fusion, re-ranking and routing shared by the search engines
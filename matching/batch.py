@@ -0,0 +1,174 @@
+import gc
+import multiprocessing as mp
+import os
+import time
+from functools import partial
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from data.noisy_data.abbreviations import get_resolver
+from database.db import iter_labeled_noisy_variants
+from matching.normalize import parse_query
+
+# Same model as data/embeddings/quadrant.py
+EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
+EMBEDDINGS_PATH = os.environ.get("VEHICLE_EMBEDDINGS_PATH", "columnar/embeddings.arrow")
+CHUNK_SIZE = 256
+
+# Read-only state loaded once per file; filled in the parent before forking so
+# workers inherit the mappings instead of loading their own
+_shared: Dict[str, tuple] = {}
+
+
+def _embedding_table(path: str):
+    if path not in _shared:
+        from database.columnar import load_embedding_table
+        table, matrix = load_embedding_table(path)
+        _shared[path] = (matrix, table["id"].to_numpy(zero_copy_only=False),
+                         table["make"].to_numpy(zero_copy_only=False),
+                         table["model"].to_numpy(zero_copy_only=False), table["year"].to_numpy())
+    return _shared[path]
+
+
+class VectorMatcher:
+    """
+    Brute-force cosine search over the memory-mapped embedding matrix written by
+    build_embeddings(embeddings_path=...). Queries are embedded a chunk at a time.
+    """
+
+    def __init__(self, path: str = EMBEDDINGS_PATH, collection_name: Optional[str] = None, threads: int = 1):
+        from fastembed import TextEmbedding
+        from data.embeddings.compression import load_projection
+        self.matrix, self.ids, self.makes, self.models, self.years = _embedding_table(path)
+        # One inference thread per worker process; the pool provides the parallelism
+        self.model = TextEmbedding(model_name=EMBEDDING_MODEL, max_length=512, threads=threads)
+        self.projection = load_projection(collection_name) if collection_name else None
+
+    def search_batch(self, queries: Sequence[str], top_k: int = 10) -> List[List[dict]]:
+        from data.embeddings.compression import apply_projection
+        parsed = [parse_query(q) for q in queries]
+        vectors = apply_projection(np.stack(list(self.model.embed([p.text for p in parsed]))), self.projection)
+        scores = vectors @ self.matrix.T
+
+        batch = []
+        for query, row in zip(parsed, scores):
+            if query.year is not None:
+                row = np.where(self.years == query.year, row, -np.inf)
+            top = np.argpartition(-row, min(top_k, len(row) - 1))[:top_k]
+            top = top[np.argsort(-row[top])]
+            batch.append([
+                {"score": round(float(row[i]), 4), "id": self.ids[i], "make": self.makes[i],
+                 "model": self.models[i], "year": int(self.years[i]), "stage": "vector"}
+                for i in top if np.isfinite(row[i])
+            ])
+        return batch
+
+
+class _FtsBatch:
+    def __init__(self):
+        from database.fts import FtsMatcher
+        self.matcher = FtsMatcher()
+
+    def search_batch(self, queries: Sequence[str], top_k: int = 10) -> List[List[dict]]:
+        return [self.matcher.search(q, top_k=top_k) for q in queries]
+
+
+def fts_matcher() -> _FtsBatch:
+    return _FtsBatch()
+
+
+def vector_matcher(path: str = EMBEDDINGS_PATH, collection_name: Optional[str] = None) -> VectorMatcher:
+    return VectorMatcher(path, collection_name)
+
+
+MATCHERS: Dict[str, Callable] = {"fts": fts_matcher, "vector": vector_matcher}
+
+
+def preload(matcher: str = "fts", embeddings_path: str = EMBEDDINGS_PATH):
+    """Load the read-only alias tables (and embedding matrix) in this process before forking."""
+    get_resolver()
+    if matcher == "vector":
+        _embedding_table(embeddings_path)
+
+
+# --- Worker side ---
+_worker = None
+
+
+def _init_worker(factory: Callable):
+    global _worker
+    _worker = factory()
+
+
+def _match_chunk(task):
+    start, queries, top_k = task
+    return start, _worker.search_batch(queries, top_k)
+
+
+def match_batch(queries: Sequence[str], top_k: int = 10, workers: Optional[int] = None,
+                matcher: str = "fts", chunk_size: int = CHUNK_SIZE,
+                factory: Optional[Callable] = None, embeddings_path: str = EMBEDDINGS_PATH) -> List[List[dict]]:
+    """
+    Match a batch of queries on a pool of worker processes.
+
+    The alias tables and embedding matrix are loaded before the pool is forked, so workers
+    share them copy-on-write (the matrix and SQLite are memory-mapped, so their pages live
+    once in the page cache). Queries are split into chunks, handed to whichever worker is
+    free, and merged back into input order.
+
+    Args:
+        queries: Raw query strings
+        top_k: Results per query
+        workers: Worker processes (default: one per core); 1 runs in-process
+        matcher: "fts" (SQLite FTS5 + edit-distance rerank) or "vector" (memory-mapped embeddings)
+        chunk_size: Queries per task; larger chunks amortize IPC, smaller ones balance load
+        factory: Custom zero-argument matcher factory (must be picklable) overriding `matcher`
+        embeddings_path: Embedding file written by build_embeddings(embeddings_path=...), for matcher="vector"
+
+    Returns:
+        One result list per query, in input order
+    """
+    if factory is None:
+        factory = partial(vector_matcher, embeddings_path) if matcher == "vector" else MATCHERS[matcher]
+    workers = workers or os.cpu_count() or 1
+    tasks = [(start, list(queries[start:start + chunk_size]), top_k)
+             for start in range(0, len(queries), chunk_size)]
+
+    if workers == 1:
+        instance = factory()
+        return [r for _, chunk, _ in tasks for r in instance.search_batch(chunk, top_k)]
+
+    preload(matcher, embeddings_path)
+    # Keep preloaded objects out of the GC's generations so collections in the
+    # workers don't touch (and copy) their pages
+    gc.freeze()
+    context = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    results: List[Optional[List[dict]]] = [None] * len(queries)
+    try:
+        with context.Pool(workers, initializer=_init_worker, initargs=(factory,)) as pool:
+            for start, chunk_results in pool.imap_unordered(_match_chunk, tasks):
+                results[start:start + len(chunk_results)] = chunk_results
+    finally:
+        gc.unfreeze()
+    return results
+
+
+def benchmark_scaling(limit: int = 5000, worker_counts: Sequence[int] = (1, 2, 4, 8, 16, 32),
+                      matcher: str = "fts", top_k: int = 10,
+                      embeddings_path: str = EMBEDDINGS_PATH) -> Dict[int, Dict[str, float]]:
+    """
+    Queries/sec of match_batch over noisy variants for each worker count, with the
+    speedup over one worker (linear scaling would make speedup equal the worker count).
+    """
+    queries = [row[0] for row in iter_labeled_noisy_variants(limit=limit)]
+    report = {}
+    print(f"⚙️  Batch matching throughput ({matcher}, {len(queries)} queries, {os.cpu_count()} cores)")
+    for workers in worker_counts:
+        start = time.perf_counter()
+        match_batch(queries, top_k=top_k, workers=workers, matcher=matcher, embeddings_path=embeddings_path)
+        qps = len(queries) / (time.perf_counter() - start)
+        speedup = qps / report[worker_counts[0]]["qps"] if report else 1.0
+        report[workers] = {"qps": round(qps, 1), "speedup": round(speedup, 2),
+                           "efficiency": round(speedup / workers * worker_counts[0], 2)}
+        print(f"   {workers:>3} workers: {report[workers]['qps']:>9} q/s  "
+              f"speedup {report[workers]['speedup']}x  efficiency {report[workers]['efficiency']}")
+    return report
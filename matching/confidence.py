@@ -0,0 +1,129 @@
+import os
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from database.db import get_labeled_noisy_variants
+from matching.logistic import fit_logistic, predict_proba, save_model, load_model
+
+CONFIDENCE_DIR = os.environ.get("CONFIDENCE_DIR", "models")
+
+CONFIDENCE_FEATURES = ["top_score", "margin", "relative_margin", "result_count", "exact_stage"]
+
+# Stages whose hits all carry the same constant score (ES keyword lookup)
+CONSTANT_SCORE_STAGES = {"exact"}
+
+
+def confidence_features(results: List[dict], k: int = 10) -> np.ndarray:
+    """
+    Features of one ranked result list that predict whether its top hit is correct:
+    the top score, its margin over the runner-up (absolute and relative) and how full the list is.
+    Results may carry "rerank_score", which then replaces the engine score.
+
+    Constant-score stages (ES exact lookups) say nothing through their scores, so their
+    score features are zero and the exact_stage indicator carries them instead; otherwise
+    the fit would place exact hits (score 1.0) at the low end of the BM25 scale.
+    """
+    scores = [r.get("rerank_score", r.get("score")) or 0.0 for r in results]
+    if not scores:
+        return np.zeros(len(CONFIDENCE_FEATURES), dtype=np.float64)
+    if "rerank_score" not in results[0] and results[0].get("stage") in CONSTANT_SCORE_STAGES:
+        return np.array([0.0, 0.0, 0.0, min(len(scores), k) / k, 1.0], dtype=np.float64)
+    top = scores[0]
+    second = scores[1] if len(scores) > 1 else 0.0
+    return np.array([
+        top,
+        top - second,
+        (top - second) / top if top > 0 else 0.0,
+        min(len(scores), k) / k,
+        0.0,
+    ], dtype=np.float64)
+
+
+class Calibrator:
+    """
+    Platt-style calibration of one engine: maps its result list to P(top hit is correct).
+    Fitted without class balancing so outputs are real probabilities on the noisy_variants mix.
+    """
+
+    def __init__(self, engine: str, model: Dict):
+        if model["feature_names"] != CONFIDENCE_FEATURES:
+            raise ValueError(f"Calibrator for {engine} was fitted on a different feature set; refit it")
+        self.engine = engine
+        self.model = model
+
+    @staticmethod
+    def path(engine: str) -> str:
+        return os.path.join(CONFIDENCE_DIR, f"confidence_{engine}.json")
+
+    @classmethod
+    def load(cls, engine: str) -> "Calibrator":
+        return cls(engine, load_model(cls.path(engine)))
+
+    def save(self):
+        save_model(self.model, self.path(self.engine))
+
+    def confidence(self, results: List[dict]) -> float:
+        if not results:
+            return 0.0
+        features = confidence_features(results, self.model.get("k", 10))
+        return float(predict_proba(self.model, features[None, :])[0])
+
+
+def _top_is_truth(results: List[dict], truth: tuple) -> bool:
+    return bool(results) and (results[0]["make"], results[0]["model"], results[0]["year"]) == truth
+
+
+def fit_calibrators(search_fns: Dict[str, Callable], limit: int = 2000, offset: int = 0,
+                    k: int = 5, save: bool = True) -> Dict[str, Calibrator]:
+    """
+    Fit one calibrator per engine on labeled noisy variants.
+
+    Args:
+        search_fns: engine name -> search(query, k) returning ranked result dicts
+        limit: Number of noisy variants to fit on
+        offset: Starting offset into noisy_variants
+        k: Results requested per query
+        save: Write each calibrator to CONFIDENCE_DIR
+
+    Returns:
+        Dict of engine name -> Calibrator
+    """
+    variants = get_labeled_noisy_variants(limit=limit, offset=offset)
+    if not variants:
+        raise ValueError("No noisy variants to fit calibrators on; run load_noise() first")
+    calibrators = {}
+
+    for engine, search_fn in search_fns.items():
+        X, y = [], []
+        for noisy_string, make_name, model_name, year, _ in variants:
+            results = search_fn(noisy_string, k)
+            X.append(confidence_features(results, k))
+            y.append(float(_top_is_truth(results, (make_name, model_name, year))))
+        X, y = np.array(X), np.array(y)
+
+        if 0 < y.sum() < len(y):
+            model = fit_logistic(X, y, CONFIDENCE_FEATURES, balance=False)
+        else:
+            # Degenerate slice (always right or always wrong): constant confidence
+            model = {"feature_names": CONFIDENCE_FEATURES, "weights": [0.0] * len(CONFIDENCE_FEATURES),
+                     "bias": float(np.log((y.mean() + 1e-6) / (1 - y.mean() + 1e-6))),
+                     "mean": [0.0] * len(CONFIDENCE_FEATURES), "std": [1.0] * len(CONFIDENCE_FEATURES)}
+
+        model["k"] = k
+        calibrator = Calibrator(engine, model)
+        if save:
+            calibrator.save()
+        calibrators[engine] = calibrator
+
+        predicted = predict_proba(model, X)
+        print(f"🎯 {engine}: top-1 accuracy {y.mean():.4f}, mean confidence {predicted.mean():.4f} "
+              f"(Brier {np.mean((predicted - y) ** 2):.4f})")
+
+    return calibrators
+
+
+def load_calibrators(engines: List[str]) -> Dict[str, Optional[Calibrator]]:
+    """Load saved calibrators; engines without one map to None."""
+    return {
+        engine: Calibrator.load(engine) if os.path.exists(Calibrator.path(engine)) else None
+        for engine in engines
+    }
@@ -0,0 +1,29 @@
+from typing import Callable, List, Optional
+
+
+def family_key(make_id: str, model_name: str) -> str:
+    """Stable key of a collapsed (make, model) document / point."""
+    return f"{make_id}/{model_name}"
+
+
+def expand_families(results: List[dict], year: Optional[int], top_k: int,
+                    id_fn: Callable[[str, int], str]) -> List[dict]:
+    """
+    Expand collapsed (make, model) hits back into (model_id, year) results.
+
+    A hit carrying "variants" ([{"year", "model_id"}, ...]) becomes one result per variant,
+    newest year first, restricted to `year` when the query named one. Hits from a regular
+    per-year index pass through unchanged.
+    """
+    expanded = []
+    for result in results:
+        variants = result.pop("variants", None)
+        if not variants:
+            expanded.append(result)
+            continue
+        for variant in sorted(variants, key=lambda v: -v["year"]):
+            if year is not None and variant["year"] != year:
+                continue
+            expanded.append(dict(result, id=id_fn(variant["model_id"], variant["year"]),
+                                 year=variant["year"], model_id=variant["model_id"]))
+    return expanded[:top_k]
@@ -0,0 +1,173 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from data.noisy_data.abbreviations import get_resolver
+from matching.normalize import CACHE_SIZE, split_year
+
+# Engines whose scores are used as features (missing engines contribute zeros)
+ENGINES = ("es", "qdrant")
+
+FEATURE_NAMES = [
+    "year_match",
+    "year_distance",
+    "token_jaccard",
+    "make_jaro_winkler",
+    "model_jaro_winkler",
+    "make_edit_similarity",
+    "model_edit_similarity",
+    "alias_hit",
+] + [f"{engine}_{kind}" for engine in ENGINES for kind in ("score", "reciprocal_rank")]
+
+
+def jaro_winkler(a: str, b: str, prefix_scale: float = 0.1) -> float:
+    """Jaro-Winkler similarity in [0, 1]."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, ch in enumerate(a):
+        lo, hi = max(0, i - window), min(len(b), i + window + 1)
+        for j in range(lo, hi):
+            if not b_matched[j] and b[j] == ch:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    transpositions = 0
+    j = 0
+    for i, ch in enumerate(a):
+        if a_matched[i]:
+            while not b_matched[j]:
+                j += 1
+            if ch != b[j]:
+                transpositions += 1
+            j += 1
+
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions / 2) / matches) / 3
+    prefix = 0
+    for ca, cb in zip(a[:4], b[:4]):
+        if ca != cb:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+def levenshtein(a: str, b: str) -> int:
+    """Edit distance with a two-row dynamic program."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def edit_similarity(a: str, b: str) -> float:
+    """1 - normalized edit distance, in [0, 1]."""
+    if not a and not b:
+        return 1.0
+    return 1.0 - levenshtein(a, b) / max(len(a), len(b))
+
+
+def token_jaccard(a: Sequence[str], b: Sequence[str]) -> float:
+    a, b = set(a), set(b)
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _best_window(tokens: Sequence[str], target: str, similarity) -> float:
+    """
+    Best similarity between `target` and any window of query tokens with the same
+    token count, so a make is compared to the part of the query that could be the make.
+    """
+    if not tokens or not target:
+        return 0.0
+    width = min(len(target.split()), len(tokens))
+    return max(similarity(" ".join(tokens[i:i + width]), target) for i in range(len(tokens) - width + 1))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _string_features(tokens: Tuple[str, ...], make: str, model: str) -> Tuple[float, ...]:
+    """
+    Token Jaccard and make/model Jaro-Winkler and edit similarities of one candidate text.
+    Memoized per (query tokens, make, model): the same model comes back for every year it
+    is sold in, and training, calibration and routing score the same queries repeatedly.
+    """
+    return (
+        token_jaccard(tokens, (make + " " + model).split()),
+        _best_window(tokens, make, jaro_winkler),
+        _best_window(tokens, model, jaro_winkler),
+        _best_window(tokens, make, edit_similarity),
+        _best_window(tokens, model, edit_similarity),
+    )
+
+
+def fuse_candidates(results_by_engine: Dict[str, List[dict]]) -> List[dict]:
+    """
+    Merge ranked result lists from several engines into unique candidates,
+    keyed by (make, model, year), keeping each engine's score and rank.
+    """
+    fused = {}
+    for engine, results in results_by_engine.items():
+        for rank, result in enumerate(results):
+            key = (result["make"], result["model"], result["year"])
+            candidate = fused.setdefault(key, {
+                "make": result["make"],
+                "model": result["model"],
+                "year": result["year"],
+                "engine_scores": {},
+            })
+            if engine not in candidate["engine_scores"]:
+                candidate["engine_scores"][engine] = (result.get("score") or 0.0, rank)
+    return list(fused.values())
+
+
+def candidate_features(query: str, candidates: List[dict]) -> np.ndarray:
+    """
+    Feature matrix (len(candidates) x len(FEATURE_NAMES)) for one query.
+    Engine scores are divided by that engine's best score for the query, so they are comparable.
+    """
+    year, tokens = split_year(query)
+    alias_makes = set()
+    for _, _, makes, _ in get_resolver().find(" ".join(tokens)):
+        alias_makes.update(makes)
+
+    best_score = {}
+    for candidate in candidates:
+        for engine, (score, _) in candidate["engine_scores"].items():
+            best_score[engine] = max(best_score.get(engine, 0.0), score)
+
+    X = np.zeros((len(candidates), len(FEATURE_NAMES)), dtype=np.float32)
+    for row, candidate in enumerate(candidates):
+        make = (candidate["make"] or "").lower()
+        model = (candidate["model"] or "").lower()
+        cand_year = candidate["year"]
+
+        if year is None:
+            X[row, 0], X[row, 1] = 0.5, 0.0
+        else:
+            X[row, 0] = float(cand_year == year)
+            X[row, 1] = min(abs(int(cand_year) - year), 10) / 10
+
+        X[row, 2:7] = _string_features(tokens, make, model)
+        X[row, 7] = float(make in alias_makes)
+
+        for e, engine in enumerate(ENGINES):
+            score_rank: Optional[tuple] = candidate["engine_scores"].get(engine)
+            if score_rank is not None:
+                score, rank = score_rank
+                col = 8 + 2 * e
+                X[row, col] = score / best_score[engine] if best_score[engine] > 0 else 0.0
+                X[row, col + 1] = 1.0 / (rank + 1)
+    return X
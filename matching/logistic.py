@@ -0,0 +1,57 @@
+import json
+import os
+from typing import Dict, List
+import numpy as np
+
+
+def fit_logistic(X: np.ndarray, y: np.ndarray, feature_names: List[str], l2: float = 1e-3,
+                 lr: float = 0.5, epochs: int = 500, balance: bool = True) -> Dict:
+    """
+    Fit an L2-regularized logistic regression with full-batch gradient descent.
+    Features are standardized; with balance=True positives and negatives weigh the same.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    mean = X.mean(axis=0)
+    std = X.std(axis=0)
+    std[std == 0] = 1.0
+    Z = (X - mean) / std
+
+    sample_weight = np.ones_like(y)
+    if balance and 0 < y.sum() < len(y):
+        pos = y.sum()
+        sample_weight = np.where(y == 1, len(y) / (2 * pos), len(y) / (2 * (len(y) - pos)))
+    sample_weight /= sample_weight.sum()
+
+    w = np.zeros(Z.shape[1])
+    b = 0.0
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(Z @ w + b)))
+        err = (p - y) * sample_weight
+        w -= lr * (Z.T @ err + l2 * w)
+        b -= lr * err.sum()
+
+    return {
+        "feature_names": list(feature_names),
+        "weights": w.tolist(),
+        "bias": float(b),
+        "mean": mean.tolist(),
+        "std": std.tolist(),
+    }
+
+
+def predict_proba(model: Dict, X: np.ndarray) -> np.ndarray:
+    """Probability of the positive class for each row of X."""
+    Z = (np.asarray(X, dtype=np.float64) - np.asarray(model["mean"])) / np.asarray(model["std"])
+    return 1.0 / (1.0 + np.exp(-(Z @ np.asarray(model["weights"]) + model["bias"])))
+
+
+def save_model(model: Dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(model, f, indent=2)
+
+
+def load_model(path: str) -> Dict:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,149 @@
+import os
+import re
+import time
+from functools import lru_cache
+from itertools import cycle, islice
+from typing import Dict, NamedTuple, Optional, Tuple
+from data.noisy_data.abbreviations import get_resolver
+from data.noisy_data.noise import MAKE_ABBR_MAP
+from database.streaming import MEMORY_LIMIT_MB, chunk_rows
+
+# Shared by document building (ES, Qdrant, FTS) and every query path, so a document
+# and a query for the same vehicle normalize to the same text
+
+YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+# Surrounding quotes and whitespace runs, cleaned in a single pass
+_CLEAN_RE = re.compile(r"^\s*[\"']|[\"']\s*$|\s+")
+
+# Rough footprint of one memo entry (key, value and its LRU link)
+CACHE_ENTRY_BYTES = 400
+# Entries per memo table: catalog makes/models and vendor strings repeat heavily, but the
+# five tables together stay within an eighth of the memory ceiling. Every worker process
+# fills its own copies, so this is a per-process budget.
+CACHE_SIZE = int(os.environ.get("VEHICLE_NORMALIZE_CACHE_SIZE", 0)) or \
+    chunk_rows(5 * CACHE_ENTRY_BYTES, MEMORY_LIMIT_MB // 8, minimum=1024)
+
+
+class ParsedQuery(NamedTuple):
+    """
+    A query split into token classes. Tokens are lowercased, with make
+    abbreviations already expanded.
+    """
+    year: Optional[int]
+    make: Optional[str]             # Full make name when it was identified unambiguously
+    make_tokens: Tuple[str, ...]
+    model_tokens: Tuple[str, ...]   # Everything that is neither the year nor the make
+
+    @property
+    def tokens(self) -> Tuple[str, ...]:
+        """Make then model tokens, so reordered strings come out in catalog order."""
+        return self.make_tokens + self.model_tokens
+
+    @property
+    def text(self) -> str:
+        """Canonical "{year} {make} {model}" text, comparable with document_text()."""
+        words = self.tokens if self.year is None else (str(self.year),) + self.tokens
+        return " ".join(words)
+
+
+def _clean(match: re.Match) -> str:
+    return " " if match.group(0).isspace() else ""
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def clean_name(name: str) -> str:
+    """Strip surrounding quotes and spaces and collapse whitespace, keeping the case."""
+    return _CLEAN_RE.sub(_clean, name).strip()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace."""
+    return " ".join(text.lower().split())
+
+
+def document_text(make_name: str, model_name: Optional[str], year: Optional[int] = None) -> str:
+    """Normalized "{year} {make} {model}" text of a catalog row (no year for collapsed families)."""
+    text = normalize_text(f"{make_name} {model_name or ''}")
+    return text if year is None else f"{year} {text}"
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def make_aliases(make_name: str) -> Tuple[str, ...]:
+    """The lowercased make name and its abbreviation, if it has one."""
+    aliases = [make_name.lower()]
+    abbr = MAKE_ABBR_MAP.get(make_name)
+    if abbr and str(abbr).lower() not in aliases:
+        aliases.append(str(abbr).lower())
+    return tuple(aliases)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def split_year(text: str) -> Tuple[Optional[int], Tuple[str, ...]]:
+    """(year, remaining tokens) of a lowercased string, without expanding abbreviations."""
+    text = text.lower()
+    year_match = YEAR_RE.search(text)
+    if year_match is None:
+        return None, tuple(text.split())
+    return int(year_match.group(0)), tuple((text[:year_match.start()] + " " + text[year_match.end():]).split())
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_query(query: str) -> ParsedQuery:
+    """
+    Parse a raw vendor string: expand make abbreviations, pull out the year and
+    classify the first make alias found (anywhere in the string) as the make.
+
+    Handles the noise generate_variants() produces: reordered tokens are put back in
+    catalog order by ParsedQuery.tokens / .text, and a dropped year or make simply
+    leaves that field empty.
+    """
+    year, tokens = split_year(get_resolver().rewrite(query))
+    spans = get_resolver().find(" ".join(tokens))
+    if not spans:
+        return ParsedQuery(year, None, (), tokens)
+    start, end, makes, is_abbr = spans[0]
+    make_tokens = tokens[start:end]
+    # A full make name is the make even when other makes abbreviate to the same string
+    make = " ".join(make_tokens) if not is_abbr else (makes[0] if len(makes) == 1 else None)
+    return ParsedQuery(year, make, make_tokens, tokens[:start] + tokens[end:])
+
+
+def cache_info() -> Dict[str, tuple]:
+    return {fn.__name__: fn.cache_info() for fn in (clean_name, normalize_text, make_aliases, split_year, parse_query)}
+
+
+def clear_caches():
+    for fn in (clean_name, normalize_text, make_aliases, split_year, parse_query):
+        fn.cache_clear()
+
+
+def benchmark(n_strings: int = 1_000_000, distinct: int = 20_000) -> Dict[str, Dict[str, float]]:
+    """
+    Strings per minute through each normalization stage. Each stage runs twice from
+    empty caches: a cold pass over the `distinct` catalog rows / noisy variants once each,
+    then those inputs cycled up to n_strings, which adds realistic cache hits (catalog
+    names repeat across years, vendor strings repeat across feeds).
+    """
+    from database.db import iter_canonical_models, iter_labeled_noisy_variants
+    rows = list(iter_canonical_models(limit=distinct))
+    queries = [row[0] for row in iter_labeled_noisy_variants(limit=distinct)]
+    stages = {
+        "clean_name": (rows, lambda items: [clean_name(model) for _, model, _ in items]),
+        "document_text": (rows, lambda items: [document_text(make, model, year) for make, model, year in items]),
+        "parse_query": (queries, lambda items: [parse_query(q) for q in items]),
+    }
+
+    get_resolver()
+    report = {}
+    print(f"⚙️  Normalization throughput ({len(rows)} distinct rows, {len(queries)} distinct queries, "
+          f"{CACHE_SIZE:,} cache entries per stage)")
+    for name, (inputs, run) in stages.items():
+        for label, items in ((f"{name} (cold)", lambda: inputs), (name, lambda: islice(cycle(inputs), n_strings))):
+            clear_caches()
+            start = time.perf_counter()
+            count = len(run(items()))
+            elapsed = time.perf_counter() - start
+            report[label] = {"strings": count, "per_minute": round(count / elapsed * 60)}
+            print(f"   {label:<22} {report[label]['per_minute']:>14,} strings/min")
+    return report
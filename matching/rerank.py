@@ -0,0 +1,127 @@
+import os
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from database.db import iter_labeled_noisy_variants
+from matching.features import FEATURE_NAMES, candidate_features, fuse_candidates
+from matching.logistic import fit_logistic, predict_proba, save_model, load_model
+
+RERANKER_PATH = os.environ.get("RERANKER_PATH", "models/reranker.json")
+
+# Candidates kept per engine at retrieval time; re-ranking lets this stay small
+RETRIEVAL_K = 5
+
+
+def default_search_fns() -> Dict[str, Callable]:
+    """
+    Engine search functions keyed by engine name.
+    Imported lazily so the re-ranker can be used without both engines installed.
+    """
+    from es_module.search import search as es_search
+    from data.embeddings.test_quadrant import search as qdrant_search
+    return {"es": es_search, "qdrant": qdrant_search}
+
+
+def retrieve(query: str, search_fns: Dict[str, Callable], k: int = RETRIEVAL_K) -> List[dict]:
+    """Run every engine for `query` and fuse their top-k lists."""
+    return fuse_candidates({engine: fn(query, k) for engine, fn in search_fns.items()})
+
+
+class Reranker:
+    """
+    Scores fused candidates with a logistic model over cheap string features
+    (year match, token Jaccard, Jaro-Winkler / edit similarity, alias hit, engine scores).
+    """
+
+    def __init__(self, model: Dict):
+        if model["feature_names"] != FEATURE_NAMES:
+            raise ValueError("Re-ranker model was trained on a different feature set; retrain it")
+        self.model = model
+
+    @classmethod
+    def load(cls, path: str = RERANKER_PATH) -> "Reranker":
+        return cls(load_model(path))
+
+    def rerank(self, query: str, candidates: List[dict], top_k: Optional[int] = None) -> List[dict]:
+        """
+        Return candidates sorted by re-ranker probability, each with a "rerank_score".
+        """
+        if not candidates:
+            return []
+        scores = predict_proba(self.model, candidate_features(query, candidates))
+        order = np.argsort(-scores, kind="stable")
+        ranked = [dict(candidates[i], rerank_score=round(float(scores[i]), 4)) for i in order]
+        return ranked[:top_k] if top_k else ranked
+
+
+def _is_truth(candidate: dict, truth: tuple) -> bool:
+    return (candidate["make"], candidate["model"], candidate["year"]) == truth
+
+
+def build_training_set(search_fns: Dict[str, Callable], limit: int = 2000, offset: int = 0,
+                       k: int = RETRIEVAL_K):
+    """
+    Retrieve candidates for labeled noisy variants and label the canonical record.
+    Returns (X, y, groups) where groups holds (query, candidates, truth) for evaluation.
+    """
+    X_parts, y_parts, groups = [], [], []
+    for noisy_string, make_name, model_name, year, _ in iter_labeled_noisy_variants(limit=limit, offset=offset):
+        truth = (make_name, model_name, year)
+        candidates = retrieve(noisy_string, search_fns, k)
+        if not candidates:
+            continue
+        X_parts.append(candidate_features(noisy_string, candidates))
+        y_parts.append(np.array([_is_truth(c, truth) for c in candidates], dtype=np.float32))
+        groups.append((noisy_string, candidates, truth))
+
+    if not X_parts:
+        return np.zeros((0, len(FEATURE_NAMES))), np.zeros(0), groups
+    return np.vstack(X_parts), np.concatenate(y_parts), groups
+
+
+def train_reranker(limit: int = 2000, offset: int = 0, k: int = RETRIEVAL_K,
+                   path: str = RERANKER_PATH, search_fns: Optional[Dict[str, Callable]] = None) -> Reranker:
+    """
+    Train the re-ranker offline on the noisy_variants table and save it to `path`.
+    """
+    search_fns = search_fns or default_search_fns()
+    X, y, _ = build_training_set(search_fns, limit=limit, offset=offset, k=k)
+    print(f"📚 Training re-ranker on {len(y)} candidates ({int(y.sum())} positives)")
+    if not y.sum():
+        raise ValueError("No candidate matched its canonical record; cannot train the re-ranker")
+
+    model = fit_logistic(X, y, FEATURE_NAMES)
+    save_model(model, path)
+    print(f"✅ Saved re-ranker to {path}")
+    return Reranker(model)
+
+
+def evaluate_reranker(reranker: Reranker, limit: int = 500, offset: int = 2000, k: int = RETRIEVAL_K,
+                      search_fns: Optional[Dict[str, Callable]] = None) -> Dict[str, float]:
+    """
+    Recall@1 of each engine alone vs. the re-ranked fused candidates.
+    Use an offset past the training slice so the numbers are held out.
+    """
+    search_fns = search_fns or default_search_fns()
+    hits = {engine: 0 for engine in search_fns}
+    hits["reranked"] = 0
+    in_candidates = 0
+    total = 0
+
+    for noisy_string, make_name, model_name, year, _ in iter_labeled_noisy_variants(limit=limit, offset=offset):
+        truth = (make_name, model_name, year)
+        candidates = retrieve(noisy_string, search_fns, k)
+        total += 1
+        for engine in search_fns:
+            top = [c for c in candidates if c["engine_scores"].get(engine, (0, None))[1] == 0]
+            hits[engine] += int(bool(top) and _is_truth(top[0], truth))
+        ranked = reranker.rerank(noisy_string, candidates, top_k=1)
+        hits["reranked"] += int(bool(ranked) and _is_truth(ranked[0], truth))
+        in_candidates += int(any(_is_truth(c, truth) for c in candidates))
+
+    metrics = {f"Recall@1 {name}": count / max(total, 1) for name, count in hits.items()}
+    # Upper bound: the re-ranker can only pick records some engine retrieved
+    metrics[f"Recall@{k} fused"] = in_candidates / max(total, 1)
+    print(f"📊 Re-ranker evaluation on {total} held-out noisy variants (k={k} per engine)")
+    for name, value in metrics.items():
+        print(f"   {name}: {value:.4f}")
+    return metrics
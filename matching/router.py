@@ -0,0 +1,122 @@
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+from matching.confidence import Calibrator, load_calibrators, fit_calibrators
+from matching.rerank import Reranker, retrieve, default_search_fns
+
+# Calibrated probability that the top hit is correct
+ACCEPT_THRESHOLD = 0.9
+ABSTAIN_THRESHOLD = 0.5
+
+
+def reuse_last_query(search_fn: Callable) -> Callable:
+    """
+    Wrap an engine search so a repeated call for the same query (and no larger k) reuses
+    the previous results: the hybrid stage then fuses the candidates the earlier stages
+    already fetched instead of querying every engine again.
+    """
+    last = {}
+
+    def search(query: str, k: int = 10) -> List[dict]:
+        if last.get("query") != query or last["k"] < k:
+            last.update(query=query, k=k, results=search_fn(query, k))
+        return last["results"][:k]
+    return search
+
+
+def hybrid_search_fn(reranker: Reranker, search_fns: Dict[str, Callable]) -> Callable:
+    """
+    Search function for the hybrid stage: fuse every engine's candidates and re-rank them.
+    """
+    def hybrid_search(query: str, k: int = 10) -> List[dict]:
+        return reranker.rerank(query, retrieve(query, search_fns), top_k=k)
+    return hybrid_search
+
+
+class Router:
+    """
+    Runs stages from cheapest to most expensive and stops at the first confident answer.
+
+    A query is accepted as soon as a stage's calibrated confidence reaches accept_threshold.
+    Otherwise it escalates; after the last stage the most confident answer is accepted if it
+    reaches abstain_threshold, and the router abstains (needs manual review) below that.
+    """
+
+    def __init__(self, stages: List[Tuple[str, Callable, Optional[Calibrator]]],
+                 accept_threshold: float = ACCEPT_THRESHOLD, abstain_threshold: float = ABSTAIN_THRESHOLD):
+        if not stages:
+            raise ValueError("Router needs at least one stage")
+        missing = [name for name, _, calibrator in stages if calibrator is None]
+        if missing:
+            raise ValueError(f"No calibrator for stage(s) {missing}; run fit_calibrators() first")
+        self.stages = stages
+        self.accept_threshold = accept_threshold
+        self.abstain_threshold = abstain_threshold
+        self.counts = Counter()
+
+    def route(self, query: str, top_k: int = 5) -> Dict:
+        """
+        Returns:
+            Dict with decision ("accept" / "abstain"), stage, confidence, results and stages_tried
+        """
+        best = None
+        for tried, (name, search_fn, calibrator) in enumerate(self.stages, 1):
+            results = search_fn(query, top_k)
+            confidence = calibrator.confidence(results)
+            if best is None or confidence > best["confidence"]:
+                best = {"stage": name, "confidence": round(confidence, 4), "results": results}
+            if confidence >= self.accept_threshold:
+                break
+
+        decision = "accept" if best["confidence"] >= self.abstain_threshold else "abstain"
+        self.counts["queries"] += 1
+        self.counts["escalated"] += int(tried > 1)
+        self.counts[f"{decision}:{best['stage']}" if decision == "accept" else "abstain"] += 1
+        return dict(best, query=query, decision=decision, stages_tried=tried)
+
+    def route_batch(self, queries: List[str], top_k: int = 5) -> List[Dict]:
+        return [self.route(query, top_k) for query in queries]
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.counts["escalated"] / max(self.counts["queries"], 1)
+
+    @property
+    def abstain_rate(self) -> float:
+        return self.counts["abstain"] / max(self.counts["queries"], 1)
+
+    def report(self) -> Dict[str, float]:
+        """Print and return the share of traffic taken by each path."""
+        total = max(self.counts["queries"], 1)
+        report = {"queries": self.counts["queries"], "escalation_rate": round(self.escalation_rate, 4),
+                  "abstain_rate": round(self.abstain_rate, 4)}
+        for name, _, _ in self.stages:
+            report[f"accepted_at_{name}"] = round(self.counts[f"accept:{name}"] / total, 4)
+
+        print(f"🚦 Routed {report['queries']} queries")
+        for key, value in report.items():
+            if key != "queries":
+                print(f"   {key}: {value}")
+        return report
+
+
+def default_router(reranker: Optional[Reranker] = None, **thresholds) -> Router:
+    """
+    ES first (cheapest), then the vector search, then the re-ranked hybrid of both
+    (which reuses the candidates the first two stages retrieved for the query).
+    Uses calibrators saved by fit_default_calibrators().
+    """
+    search_fns = {engine: reuse_last_query(fn) for engine, fn in default_search_fns().items()}
+    reranker = reranker or Reranker.load()
+    stage_fns = {**search_fns, "hybrid": hybrid_search_fn(reranker, search_fns)}
+    calibrators = load_calibrators(list(stage_fns))
+    stages = [(name, stage_fns[name], calibrators[name]) for name in ("es", "qdrant", "hybrid")]
+    return Router(stages, **thresholds)
+
+
+def fit_default_calibrators(limit: int = 2000, offset: int = 0, k: int = 5,
+                            reranker: Optional[Reranker] = None) -> Dict[str, Calibrator]:
+    """Fit and save calibrators for the es, qdrant and hybrid stages."""
+    search_fns = default_search_fns()
+    reranker = reranker or Reranker.load()
+    stage_fns = {**search_fns, "hybrid": hybrid_search_fn(reranker, search_fns)}
+    return fit_calibrators(stage_fns, limit=limit, offset=offset, k=k)
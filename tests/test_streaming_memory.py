@@ -0,0 +1,126 @@
+"""
+Peak memory of the catalog build and eval pipelines must not grow with the catalog.
+
+Each stage runs over a small and a 5x larger synthetic catalog in SQLite, and the
+larger run's tracemalloc peak (Python heap) must stay within TOLERANCE of the smaller
+one's. The memory ceiling is small enough that both catalogs exceed every buffer it
+sizes (fetch chunks, embedding chunks, bulk requests, memo tables), and each stage runs
+once before measuring so one-time loads are left out. The ES cluster and Qdrant server
+are replaced by sinks that serialize each request and drop it, so only the client-side
+pipeline is measured, not the store.
+"""
+import json
+import os
+import zlib
+
+import numpy as np
+import pytest
+
+MEMORY_MB = 4
+SIZES = (10_000, 50_000)
+TOLERANCE = 1.5
+
+# Backends and cache sizes are chosen at import
+os.environ["VEHICLE_MEMORY_LIMIT_MB"] = str(MEMORY_MB)
+os.environ.setdefault("ELASTICSEARCH_BACKEND", "fake")
+os.environ.setdefault("QDRANT_PATH", ":memory:")
+
+import database.db as db
+from database.streaming import peak_memory_mb, synthetic_rows
+
+
+@pytest.fixture(scope="module")
+def catalogs(tmp_path_factory):
+    """Catalog size -> path of a vehicle.db with that many models and one noisy variant each."""
+    paths, original = {}, db.DB_NAME
+    for n in SIZES:
+        path = str(tmp_path_factory.mktemp(f"catalog_{n}") / "vehicle.db")
+        db.DB_NAME = path
+        db.init_db()
+        conn = db.get_connection()
+        conn.executemany("INSERT INTO makes (make_id, make_name, data_source) VALUES (?, ?, 'TEST')",
+                         ((str(i), f"MAKE {i}") for i in range(min(n, 10000))))
+        conn.executemany("INSERT INTO models (model_id, model_name, make_id, year) VALUES (?, ?, ?, ?)",
+                         ((model_id, model, make_id, year)
+                          for _, model, year, make_id, model_id in synthetic_rows(n)))
+        conn.executemany("INSERT INTO noisy_variants (noisy_string, model_id, make_id, year, noise_type) "
+                         "VALUES (?, ?, ?, ?, 'test')",
+                         ((f"{year} {make.lower()} {model.lower()}", model_id, make_id, year)
+                          for make, model, year, make_id, model_id in synthetic_rows(n)))
+        conn.commit()
+        conn.close()
+        paths[n] = path
+    db.DB_NAME = original
+    return paths
+
+
+def assert_flat(stage, catalogs, monkeypatch):
+    monkeypatch.setattr(db, "DB_NAME", catalogs[SIZES[0]])
+    stage()
+    peaks = {}
+    for n, path in catalogs.items():
+        monkeypatch.setattr(db, "DB_NAME", path)
+        peaks[n] = peak_memory_mb(stage)
+    small, large = peaks[SIZES[0]], peaks[SIZES[-1]]
+    assert large <= TOLERANCE * max(small, 1.0), f"Peak memory grows with catalog size: {peaks}"
+
+
+@pytest.fixture
+def es_sink(monkeypatch, tmp_path):
+    """Fake ES whose bulk endpoint serializes the request body and discards it."""
+    from es_module import indexing
+
+    def bulk(operations, **kwargs):
+        lines = [json.dumps(op) for op in operations]
+        items = [{op: {"status": 201}} for line in lines for op in json.loads(line)
+                 if op in ("index", "create", "delete")]
+        return {"errors": False, "items": items}
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(indexing.client, "bulk", bulk)
+    return indexing
+
+
+@pytest.fixture
+def qdrant_sink(monkeypatch, tmp_path):
+    """In-memory Qdrant that drops upserts, with a hash embedder in place of the ONNX model."""
+    try:
+        from data.embeddings import quadrant
+    except Exception as e:  # The embedding model is downloaded on first import
+        pytest.skip(f"embedding model unavailable: {e}")
+
+    class HashEmbedder:
+        def embed(self, texts):
+            for text in texts:
+                yield np.full(quadrant.EMBEDDING_DIM, zlib.crc32(text.encode()) / 2 ** 32, dtype=np.float32)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(quadrant, "embedding_model", HashEmbedder())
+    monkeypatch.setattr(quadrant.client, "upsert", lambda collection_name, points, **kwargs: None)
+    return quadrant
+
+
+def test_build_index_memory_is_flat(catalogs, es_sink, monkeypatch):
+    def stage():
+        es_sink.create_index("vehicles_memtest", recreate=True)
+        assert es_sink.build_index(limit=None, index_name="vehicles_memtest", memory_mb=MEMORY_MB) > 0
+    assert_flat(stage, catalogs, monkeypatch)
+
+
+def test_build_embeddings_memory_is_flat(catalogs, qdrant_sink, monkeypatch):
+    def stage():
+        assert qdrant_sink.build_embeddings(limit=None, collection_name="vehicles_memtest",
+                                            memory_mb=MEMORY_MB) > 0
+    assert_flat(stage, catalogs, monkeypatch)
+
+
+def test_eval_loops_memory_is_flat(catalogs, es_sink, monkeypatch):
+    from database.results import stratified_sample
+    from es_module.test_elasticsearch import evaluate
+
+    es_sink.create_index("vehicles_memtest", recreate=True)
+
+    def stage():
+        evaluate(limit=None, k=10, index_name="vehicles_memtest")
+        assert len(list(stratified_sample(per_stratum=100))) == 100
+    assert_flat(stage, catalogs, monkeypatch)